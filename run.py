@@ -2,13 +2,19 @@ import argparse
 import yaml
 import sys
 from pathlib import Path
+from solar_flyby_sim.config import ConfigError, SimConfig, calibrate, plan_run
 from solar_flyby_sim.logging_config import setup_logging
 from solar_flyby_sim.sim.driver import run_simulation
+from solar_flyby_sim.sim.batch import run_batch
 
 
 def main():
     parser = argparse.ArgumentParser(description="solar_flyby_sim runner")
     parser.add_argument("--config", required=True, help="Path to YAML config")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="validate, plan and time a short calibration integration, then exit")
+    parser.add_argument("--calibrate-steps", type=int, default=200,
+                        help="steps integrated by --dry-run (default 200)")
     args = parser.parse_args()
 
     cfg_path = Path(args.config)
@@ -17,13 +23,29 @@ def main():
         sys.exit(1)
 
     with open(cfg_path, "r") as f:
-        config = yaml.safe_load(f)
+        raw = yaml.safe_load(f)
 
-    log = setup_logging(config.get("logging", {}))
+    log = setup_logging((raw or {}).get("logging") or {})
     log.info("Loaded config: %s", cfg_path)
 
-    run_simulation(config)
+    # Resolve and check everything before any expensive setup
+    try:
+        config = SimConfig.from_dict(raw)
+        plan = plan_run(config)
+    except ConfigError as e:
+        log.error("%s", e)
+        sys.exit(2)
+
+    if args.dry_run:
+        plan.calibration = calibrate(config, plan, steps=args.calibrate_steps)
+        log.info("Dry run:\n%s", plan.summary())
+        return
+
+    if config.batch.enabled:
+        run_batch(config)
+    else:
+        run_simulation(config, plan)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,14 +1,134 @@
+"""Conservation diagnostics sampled on their own cadence.
+
+Energy includes the REBOUNDx terms that are actually being integrated: with GR
+on, ``rx.gr_hamiltonian`` (Newtonian + 1PN) replaces ``sim.energy()``, and the
+J2 potential of ``gravitational_harmonics`` is added when that force is loaded.
+Running max |ΔE/E0| and |ΔL/L0| are kept as scalars; samples are buffered in a
+fixed-size array and appended to ``energy.csv`` / ``angmom.csv`` on flush.
+
+E and L jump when a flyby star enters or leaves, so ``rebase`` re-anchors E0/L0
+and starts a new constant-N ``segment`` (a column in both files). Readers of
+the raw ``E``/``L`` columns re-anchor at the first sample of each segment.
+"""
+from __future__ import annotations
+import logging
+from pathlib import Path
 import numpy as np
+import pandas as pd
+
+log = logging.getLogger("solar_flyby_sim.diagnostics")
+
+_E_COLS = ["t", "E", "dE_rel", "segment"]
+_L_COLS = ["t", "Lx", "Ly", "Lz", "dL_rel", "segment"]
+
 
 class Diagnostics:
-    def __init__(self, sim):
+    def __init__(self, sim, outdir: Path | None = None,
+                 warn_dE: float | None = None, warn_dL: float | None = None,
+                 buffer_rows: int = 4096):
         self.sim = sim
+        contents = getattr(sim, "contents", None) or {}
+        self._rx = contents.get("reboundx")
+        self._gr = contents.get("gr")
+        self._obl = contents.get("obl")
+
+        self.outdir = Path(outdir) if outdir is not None else None
+        self.warn_dE = warn_dE
+        self.warn_dL = warn_dL
+        self._next_warn = {"E": warn_dE or None, "L": warn_dL or None}  # 0 disables
+
+        self.E0: float | None = None
+        self.E_last: float | None = None
+        self.L0: np.ndarray | None = None
+        self.max_dE = 0.0
+        self.max_dL = 0.0
+        self.n_samples = 0
+        self.segment = 0
+        self._E_scale = self._L_scale = 1.0
+
+        self._buf = np.empty((int(buffer_rows), 8))  # t, E, dE, Lx, Ly, Lz, dL, segment
+        self._n = 0
+        self._wrote_header = False
 
-    def energy(self):
-        # REBOUND API: sim.energy()
-        return self.sim.energy()
+    def energy(self) -> float:
+        """Total energy consistent with the integrated forces."""
+        if self._rx is not None and self._gr is not None:
+            E = self._rx.gr_hamiltonian(self._gr)
+        else:
+            E = self.sim.energy()
+        if self._rx is not None and self._obl is not None:
+            E += self._rx.gravitational_harmonics_potential()
+        return E
 
     def angular_momentum(self):
         # REBOUND API: sim.angular_momentum() -> (Lx, Ly, Lz)
         Lx, Ly, Lz = self.sim.angular_momentum()
         return np.array([Lx, Ly, Lz])
+
+    def rebase(self) -> None:
+        """Re-anchor E0/L0 at the next sample (e.g. after particles were added).
+
+        Running maxima are kept, so they cover every constant-N segment.
+        """
+        self.E0 = None
+
+    def update(self) -> None:
+        """Sample E and L at the current time and update running maxima."""
+        E = self.energy()
+        L = self.angular_momentum()
+        if self.E0 is None:
+            if self.n_samples:
+                self.segment += 1
+            self.E0, self.L0 = E, L
+            self._E_scale = abs(E) if E != 0 else 1.0
+            L0_norm = float(np.linalg.norm(L))
+            self._L_scale = L0_norm if L0_norm != 0 else 1.0
+        self.E_last = E
+        dE = abs(E - self.E0) / self._E_scale
+        dL = float(np.linalg.norm(L - self.L0)) / self._L_scale
+        if dE > self.max_dE:
+            self.max_dE = dE
+            self._check("E", dE)
+        if dL > self.max_dL:
+            self.max_dL = dL
+            self._check("L", dL)
+
+        row = self._buf[self._n]
+        row[0], row[1], row[2] = self.sim.t, E, dE
+        row[3:6] = L
+        row[6] = dL
+        row[7] = self.segment
+        self._n += 1
+        self.n_samples += 1
+        if self._n == self._buf.shape[0]:
+            self.flush()
+
+    def _check(self, which: str, drift: float) -> None:
+        # Warn on first crossing, then again each time the drift grows tenfold
+        limit = self._next_warn[which]
+        if limit is None or drift < limit:
+            return
+        name = "|ΔE/E0|" if which == "E" else "|ΔL/L0|"
+        log.warning("%s = %.3e exceeded %.1e at t=%.6g", name, drift, limit, self.sim.t)
+        while limit <= drift:
+            limit *= 10.0
+        self._next_warn[which] = limit
+
+    def flush(self) -> None:
+        if self._n == 0 or self.outdir is None:
+            self._n = 0
+            return
+        rows = self._buf[:self._n]
+        mode, header = ("a", False) if self._wrote_header else ("w", True)
+        seg = rows[:, 7].astype(np.int64)
+        energy = pd.DataFrame(rows[:, [0, 1, 2]], columns=_E_COLS[:-1]).assign(segment=seg)
+        angmom = pd.DataFrame(rows[:, [0, 3, 4, 5, 6]], columns=_L_COLS[:-1]).assign(segment=seg)
+        energy.to_csv(self.outdir / "energy.csv", mode=mode, header=header, index=False)
+        angmom.to_csv(self.outdir / "angmom.csv", mode=mode, header=header, index=False)
+        self._wrote_header = True
+        self._n = 0
+
+    def close(self) -> None:
+        self.flush()
+        log.info("Conservation: max |ΔE/E0|=%.3e, max |ΔL/L0|=%.3e over %d samples",
+                 self.max_dE, self.max_dL, self.n_samples)
@@ -103,20 +103,23 @@ def _rv_to_kepler(r: np.ndarray, v: np.ndarray, mu: float) -> dict:
         "f": float(f),
     }
 
-def compute_elements(sim, central_index: int = 0):
+def compute_elements(sim, central_index: int = 0, n_bodies: int | None = None):
     """
     Compute osculating elements for all bodies relative to the central body.
-    Returns a list of dicts (one per non-central body).
+    Returns a list of dicts (one per non-central body). If ``n_bodies`` is given,
+    only the first ``n_bodies`` particles are used (e.g. to skip flyby stars).
     """
     parts = sim.particles
     if central_index < 0 or central_index >= len(parts):
         raise IndexError("central_index out of range.")
     pc = parts[central_index]
+    n = len(parts) if n_bodies is None else min(int(n_bodies), len(parts))
 
     out = []
-    for j, p in enumerate(parts):
+    for j in range(n):
         if j == central_index:
             continue
+        p = parts[j]
         r = np.array([p.x - pc.x, p.y - pc.y, p.z - pc.z], dtype=float)
         v = np.array([p.vx - pc.vx, p.vy - pc.vy, p.vz - pc.vz], dtype=float)
         mu = sim.G * (pc.m + p.m)
@@ -125,3 +128,96 @@ def compute_elements(sim, central_index: int = 0):
         out.append(elems)
     return out
 
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.einsum("...k,...k->...", a, b)
+
+
+def rv_to_kepler_arrays(r, v, mu) -> dict:
+    """Vectorized ``_rv_to_kepler`` over leading axes.
+
+    ``r`` and ``v`` have shape (..., 3), ``mu`` broadcasts against (...).
+    Returns the same keys as ``_rv_to_kepler`` with arrays of shape (...).
+    """
+    r = np.asarray(r, dtype=float)
+    v = np.asarray(v, dtype=float)
+    mu = np.broadcast_to(np.asarray(mu, dtype=float), r.shape[:-1])
+
+    r_norm = np.linalg.norm(r, axis=-1)
+    v_norm = np.linalg.norm(v, axis=-1)
+    if np.any(r_norm < _EPS):
+        raise ValueError("Position magnitude ~ 0; cannot compute elements.")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = np.cross(r, v)
+        h_norm = np.linalg.norm(h, axis=-1)
+        n_vec = np.stack([-h[..., 1], h[..., 0], np.zeros_like(h_norm)], axis=-1)  # z × h
+        n_norm = np.linalg.norm(n_vec, axis=-1)
+
+        e_vec = np.cross(v, h) / mu[..., None] - r / r_norm[..., None]
+        e = np.linalg.norm(e_vec, axis=-1)
+
+        eps = 0.5 * v_norm**2 - mu / r_norm
+        a = np.where(np.abs(eps) > _EPS, -mu / (2.0 * eps), np.inf)
+
+        i = np.where(h_norm < _EPS, 0.0, np.arccos(np.clip(h[..., 2] / h_norm, -1.0, 1.0)))
+        Omega = np.where(n_norm < _EPS, 0.0, np.mod(np.arctan2(n_vec[..., 1], n_vec[..., 0]), _TWO_PI))
+
+        rv = _dot(r, v)
+        ecc = e > _EPS
+        cosf = np.clip(_dot(e_vec, r) / (e * r_norm), -1.0, 1.0)
+        sinf = np.sign(rv) * np.sqrt(np.maximum(0.0, 1.0 - cosf**2))
+        f = np.where(ecc, np.mod(np.arctan2(sinf, cosf), _TWO_PI), 0.0)
+
+        cosw = np.clip(_dot(n_vec, e_vec) / (n_norm * e), -1.0, 1.0)
+        sinw = _dot(np.cross(n_vec, e_vec), h) / (n_norm * e * h_norm + _EPS)
+        omega = np.where(n_norm < _EPS, np.arctan2(e_vec[..., 1], e_vec[..., 0]), np.arctan2(sinw, cosw))
+        omega = np.where(ecc, np.mod(omega, _TWO_PI), 0.0)
+
+        ell = e < 1.0 - 1e-10
+        hyp = e > 1.0 + 1e-10
+        cos_f = np.cos(f)
+
+        # Elliptic
+        cosE = np.clip((e + cos_f) / (1.0 + e * cos_f), -1.0, 1.0)
+        sinE = np.sqrt(np.maximum(0.0, 1.0 - e**2)) * np.sin(f) / (1.0 + e * cos_f + _EPS)
+        E = np.arctan2(sinE, cosE)
+        M_ell = E - e * np.sin(E)
+
+        # Hyperbolic
+        a_abs = np.abs(a)
+        coshH = np.maximum((r_norm / a_abs + 1.0) / np.maximum(e, 1.0 + 1e-12), 1.0)
+        H = np.arccosh(coshH)
+        H = np.where(rv < 0.0, -H, H)
+        M_hyp = e * np.sinh(H) - H
+
+        # Parabolic
+        D = np.tan(0.5 * f)
+        M_par = D + D**3 / 3.0
+
+        M = np.mod(np.where(ell, M_ell, np.where(hyp, M_hyp, M_par)), _TWO_PI)
+        n = np.where(ell | hyp, np.sqrt(mu / a_abs**3), np.nan)
+        P = np.where(ell, _TWO_PI / n, np.nan)
+
+    return {
+        "a": a, "e": e, "i": i, "Omega": Omega, "omega": omega, "M": M,
+        "n": n, "P": P, "varpi": np.mod(Omega + omega, _TWO_PI), "f": f,
+    }
+
+
+def stacked_elements(m, xv, G: float, central_index: int = 0) -> dict:
+    """Elements of every non-central body for stacked particle states.
+
+    ``m`` has shape (..., N) and ``xv`` shape (..., N, 6) (x, y, z, vx, vy, vz),
+    e.g. (members, N) for a batch of simulations at one time. Returns a dict of
+    arrays of shape (..., N - 1) plus the body ``index`` (shape (N - 1,)).
+    """
+    m = np.asarray(m, dtype=float)
+    xv = np.asarray(xv, dtype=float)
+    idx = np.delete(np.arange(m.shape[-1]), central_index)
+    rel = xv[..., idx, :] - xv[..., central_index:central_index + 1, :]
+    mu = G * (m[..., central_index:central_index + 1] + m[..., idx])
+    out = rv_to_kepler_arrays(rel[..., :3], rel[..., 3:], mu)
+    out["index"] = idx
+    return out
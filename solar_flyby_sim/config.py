@@ -0,0 +1,667 @@
+"""Typed run configuration, resolved and checked before any integration starts.
+
+``SimConfig.from_dict`` turns the YAML mapping into dataclasses: unknown keys
+are errors (with a "did you mean" hint), values are coerced to the declared
+types (YAML reads ``5e-9`` as a string) and cross-field rules are checked.
+``plan_run`` then resolves what the run will do: step count, output and
+diagnostic schedules, number of bodies and flybys, and an estimate of disk
+and memory use, failing on anything that would only surface hours in (a
+missing elements CSV, an unwritable or too-small output disk). ``calibrate``
+integrates a few hundred steps to estimate wall time.
+
+    cfg = SimConfig.from_dict(yaml.safe_load(f))
+    plan = plan_run(cfg)
+    plan.calibration = calibrate(cfg, plan)   # optional dry-run timing
+    log.info(plan.summary())
+
+``python run.py --config cfg.yaml --dry-run`` does exactly this and exits.
+"""
+from __future__ import annotations
+import difflib
+import logging
+import math
+import os
+import shutil
+import time
+import types
+import typing
+from dataclasses import MISSING, dataclass, field, fields, is_dataclass
+from pathlib import Path
+import numpy as np
+
+from .physics.constants import AU_PER_PC, J2_SUN_DEFAULT, MU_SUN, SOLAR_MDOT_DEFAULT
+
+log = logging.getLogger("solar_flyby_sim.config")
+
+DEFAULT_ELEMENTS_CSV = "solar_flyby_sim/data/j2000_elements.csv"
+
+
+class ConfigError(ValueError):
+    """Invalid configuration; the message lists every problem found."""
+
+    def __init__(self, errors: list[str]):
+        self.errors = list(errors)
+        super().__init__("Invalid configuration:\n  " + "\n  ".join(self.errors))
+
+
+# ------------------------------
+# Sections
+# ------------------------------
+
+class _Section:
+    def to_dict(self) -> dict:
+        """Plain mapping for the dict-based helpers; unset (None) options are dropped."""
+        out = {}
+        for f in fields(self):
+            val = getattr(self, f.name)
+            if val is None:
+                continue
+            if isinstance(val, _Section):
+                val = val.to_dict()
+            elif isinstance(val, list):
+                val = [v.to_dict() if isinstance(v, _Section) else v for v in val]
+            out[f.name] = val
+        return out
+
+
+@dataclass
+class DensifyLevel(_Section):
+    k: float            # half-width in encounter crossing times
+    every_steps: int
+
+
+@dataclass
+class DensifyConfig(_Section):
+    quiet_every_steps: int | None = None
+    levels: list[DensifyLevel] | None = None
+
+
+@dataclass
+class RunConfig(_Section):
+    duration_yr: float
+    dt_yr: float
+    label: str = "run"
+    output_every_steps: int = 100
+    densify_near_flyby: bool = False
+    densify: DensifyConfig | None = None
+    seed_master: int = 20250808
+    integrator: str = "ias15"
+    smoke_stub: bool = False
+    time_mode: str = "legacy"      # legacy | grid | free (see sim.timegrid)
+
+
+@dataclass
+class PhysicsConfig(_Section):
+    gr: bool = True
+    solar_j2: bool = True
+    j2_value: float = J2_SUN_DEFAULT
+    solar_mass_loss: bool = False
+    solar_mass_loss_rate: float = SOLAR_MDOT_DEFAULT   # Msun/yr
+    plugins: list[str] = field(default_factory=list)   # modules registering force plugins
+    extra_forces: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class BodiesConfig(_Section):
+    use_default_list: bool = True
+    elements_csv: str | None = None
+
+
+@dataclass
+class FlybysConfig(_Section):
+    enabled: bool = False
+    density_scale: float = 1.0
+    impact_b_pc_max: float = 0.1
+    injection_radius_pc: float = 1.0
+    force_strong_pass: bool = False
+    strong_threshold: float | None = None
+
+
+@dataclass
+class IntruderConfig(_Section):
+    enabled: bool = False
+    mass_Msun: float = 0.5
+    v_inf_kms: float = 20.0
+    impact_param_AU: float = 1.0e4
+    r_init_AU: float = 2.0e4
+    direction_spherical_deg: list[float] = field(default_factory=lambda: [60.0, 40.0])
+
+
+@dataclass
+class DiagnosticsConfig(_Section):
+    every_steps: int | None = None
+    warn_dE: float | None = None
+    warn_dL: float | None = None
+
+
+@dataclass
+class LiveConfig(_Section):
+    enabled: bool = False
+    name: str | None = None
+    slots: int = 64
+    max_particles: int = 64
+
+
+@dataclass
+class SensitivityConfig(_Section):
+    enabled: bool = False
+    megno: bool = True
+    params: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class BatchConfig(_Section):
+    enabled: bool = False
+    members: int | None = None
+    seed_stride: int = 1
+    chunk_outputs: int = 256
+    overrides: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class IOConfig(_Section):
+    outdir: str = "outputs/run"
+
+
+@dataclass
+class LoggingConfig(_Section):
+    level: str = "INFO"
+    format: str | None = None
+
+
+@dataclass
+class SimConfig(_Section):
+    run: RunConfig
+    physics: PhysicsConfig = field(default_factory=PhysicsConfig)
+    bodies: BodiesConfig = field(default_factory=BodiesConfig)
+    flybys: FlybysConfig = field(default_factory=FlybysConfig)
+    intruder: IntruderConfig = field(default_factory=IntruderConfig)
+    diagnostics: DiagnosticsConfig = field(default_factory=DiagnosticsConfig)
+    live: LiveConfig = field(default_factory=LiveConfig)
+    sensitivity: SensitivityConfig = field(default_factory=SensitivityConfig)
+    batch: BatchConfig = field(default_factory=BatchConfig)
+    io: IOConfig = field(default_factory=IOConfig)
+    logging: LoggingConfig = field(default_factory=LoggingConfig)
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "SimConfig":
+        """Parse and check a config mapping; raises ``ConfigError`` listing all problems."""
+        errors: list[str] = []
+        cfg = _parse(cls, raw, "config", errors)
+        if cfg is not None:
+            cfg._check(errors)
+        if errors:
+            raise ConfigError(errors)
+        return cfg
+
+    @property
+    def time_grid(self):
+        from .sim.timegrid import TimeGrid
+        return TimeGrid.build(self.run.time_mode, self.run.dt_yr, self.run.duration_yr)
+
+    @property
+    def steps(self) -> int:
+        return self.time_grid.n_steps(self.run.duration_yr)
+
+    @property
+    def diag_every(self) -> int:
+        every = self.diagnostics.every_steps
+        return int(every if every is not None else self.run.output_every_steps)
+
+    def _check_forces(self, errors: list[str]) -> None:
+        from .sim.integrator import available_forces, load_plugins
+
+        phys = self.physics
+        if phys.solar_mass_loss and not phys.solar_mass_loss_rate > 0:
+            errors.append(f"physics.solar_mass_loss_rate must be > 0 (got {phys.solar_mass_loss_rate})")
+        try:
+            load_plugins(phys.plugins)
+        except ImportError as e:
+            errors.append(f"physics.plugins: {e}")
+        known = available_forces()
+        for j, spec in enumerate(phys.extra_forces):
+            where = f"physics.extra_forces[{j}]"
+            name = spec.get("name")
+            if name not in known:
+                errors.append(f"{where}: unknown force {name!r}; registered: {known}")
+            elif name == "compiled":
+                if not spec.get("library") or not spec.get("symbol"):
+                    errors.append(f"{where}: compiled forces need 'library' and 'symbol'")
+                elif not Path(spec["library"]).exists():
+                    errors.append(f"{where}: library not found: {spec['library']}")
+        if phys.gr or phys.solar_j2 or phys.solar_mass_loss or phys.extra_forces:
+            try:
+                import reboundx  # noqa: F401
+            except ImportError:
+                errors.append("physics: gr/solar_j2/solar_mass_loss/extra_forces need REBOUNDx, which is not installed")
+
+    def _check(self, errors: list[str]) -> None:
+        from .sim.integrator import force_specs
+        from .sim.sensitivity import BODY_PARAMS, FLYBY_PARAMS
+        from .sim.timegrid import MODES as TIME_MODES
+
+        run = self.run
+        if not run.dt_yr > 0:
+            errors.append(f"run.dt_yr must be > 0 (got {run.dt_yr})")
+        elif not run.duration_yr >= run.dt_yr:
+            errors.append(f"run.duration_yr ({run.duration_yr}) is shorter than one step ({run.dt_yr})")
+        if run.output_every_steps < 1:
+            errors.append("run.output_every_steps must be >= 1")
+        if run.integrator.lower() != "ias15":
+            errors.append(f"run.integrator={run.integrator!r}: only 'ias15' is supported")
+        if run.time_mode not in TIME_MODES:
+            errors.append(f"run.time_mode={run.time_mode!r}: expected one of {TIME_MODES}")
+        if run.densify is not None:
+            if not run.densify_near_flyby:
+                log.warning("run.densify is set but run.densify_near_flyby is false; it has no effect")
+            if run.densify.quiet_every_steps is not None and run.densify.quiet_every_steps < 1:
+                errors.append("run.densify.quiet_every_steps must be >= 1")
+            for j, lvl in enumerate(run.densify.levels or []):
+                if lvl.k <= 0 or lvl.every_steps < 1:
+                    errors.append(f"run.densify.levels[{j}]: need k > 0 and every_steps >= 1")
+
+        self._check_forces(errors)
+        if self.bodies.elements_csv is not None and not Path(self.bodies.elements_csv).exists():
+            errors.append(f"bodies.elements_csv not found: {self.bodies.elements_csv}")
+        elif self.bodies.elements_csv is None and not run.smoke_stub and not Path(DEFAULT_ELEMENTS_CSV).exists():
+            log.warning("%s not found; the run will use the Sun+Earth stub", DEFAULT_ELEMENTS_CSV)
+
+        if self.flybys.enabled and self.flybys.injection_radius_pc <= self.flybys.impact_b_pc_max:
+            errors.append("flybys.injection_radius_pc must exceed flybys.impact_b_pc_max")
+        intr = self.intruder
+        if intr.enabled:
+            if intr.mass_Msun <= 0 or intr.v_inf_kms <= 0 or intr.impact_param_AU <= 0:
+                errors.append("intruder: mass_Msun, v_inf_kms and impact_param_AU must be > 0")
+            if intr.r_init_AU <= intr.impact_param_AU:
+                errors.append("intruder.r_init_AU must exceed intruder.impact_param_AU")
+            if len(intr.direction_spherical_deg) != 2:
+                errors.append("intruder.direction_spherical_deg must be [theta_deg, phi_deg]")
+
+        if self.diagnostics.every_steps is not None and self.diagnostics.every_steps < 1:
+            errors.append("diagnostics.every_steps must be >= 1")
+        for name in ("warn_dE", "warn_dL"):
+            val = getattr(self.diagnostics, name)
+            if val is not None and val < 0:
+                errors.append(f"diagnostics.{name} must be >= 0")
+        if self.live.slots < 1 or self.live.max_particles < 1:
+            errors.append("live.slots and live.max_particles must be >= 1")
+
+        sens = self.sensitivity
+        if sens.enabled:
+            for j, entry in enumerate(sens.params):
+                where = f"sensitivity.params[{j}]"
+                if "flyby" in entry:
+                    allowed = FLYBY_PARAMS
+                elif "body" in entry:
+                    allowed = BODY_PARAMS
+                else:
+                    errors.append(f"{where}: needs 'flyby' or 'body'")
+                    continue
+                if entry.get("param") not in allowed:
+                    errors.append(f"{where}: param {entry.get('param')!r} not in {allowed}")
+            if not sens.params and not sens.megno:
+                log.warning("sensitivity.enabled with no params and megno off; nothing to compute")
+            if self.batch.enabled:
+                log.warning("sensitivity is not computed in batch mode")
+            left_out = [s["name"] for s in force_specs(self.physics.to_dict())]
+            if left_out:
+                log.warning("sensitivity: derivatives and MEGNO are Newtonian only; REBOUNDx does not "
+                            "evolve variational particles, so these forces are left out of them: %s",
+                            ", ".join(left_out))
+
+        batch = self.batch
+        if batch.enabled:
+            if batch.members is not None and batch.members < 1:
+                errors.append("batch.members must be >= 1")
+            if batch.chunk_outputs < 1:
+                errors.append("batch.chunk_outputs must be >= 1")
+            if self.live.enabled:
+                log.warning("live snapshots are not published in batch mode")
+
+
+# ------------------------------
+# Parsing
+# ------------------------------
+
+def _type_name(tp) -> str:
+    return getattr(tp, "__name__", str(tp))
+
+
+def _coerce(value, tp, where: str, errors: list[str]):
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin in (typing.Union, types.UnionType):
+        if value is None and type(None) in args:
+            return None
+        (inner,) = [a for a in args if a is not type(None)]
+        return _coerce(value, inner, where, errors)
+    if is_dataclass(tp):
+        return _parse(tp, value, where, errors)
+    if origin is list:
+        if not isinstance(value, (list, tuple)):
+            errors.append(f"{where}: expected a list, got {value!r}")
+            return None
+        (inner,) = args or (object,)
+        return [_coerce(v, inner, f"{where}[{j}]", errors) for j, v in enumerate(value)]
+    if tp is dict or origin is dict:
+        if not isinstance(value, dict):
+            errors.append(f"{where}: expected a mapping, got {value!r}")
+            return None
+        return dict(value)
+    if tp is bool:
+        if isinstance(value, bool):
+            return value
+        errors.append(f"{where}: expected true/false, got {value!r}")
+        return None
+    if tp is int:
+        if isinstance(value, bool):
+            errors.append(f"{where}: expected an integer, got {value!r}")
+            return None
+        try:
+            num = float(value)
+        except (TypeError, ValueError):
+            num = math.nan
+        if not math.isfinite(num) or num != int(num):
+            errors.append(f"{where}: expected an integer, got {value!r}")
+            return None
+        return int(num)
+    if tp is float:
+        if isinstance(value, bool):
+            errors.append(f"{where}: expected a number, got {value!r}")
+            return None
+        try:
+            return float(value)  # YAML reads "5e-9" (no decimal point) as a string
+        except (TypeError, ValueError):
+            errors.append(f"{where}: expected a number, got {value!r}")
+            return None
+    if tp is str:
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            return str(value)
+        errors.append(f"{where}: expected a string, got {value!r}")
+        return None
+    return value
+
+
+def _parse(cls, data, where: str, errors: list[str]):
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        errors.append(f"{where}: expected a mapping, got {data!r}")
+        return None
+    hints = typing.get_type_hints(cls)
+    names = [f.name for f in fields(cls)]
+    for key in data:
+        if key not in names:
+            hint = difflib.get_close_matches(str(key), names, n=1)
+            errors.append(f"{where}.{key}: unknown key" + (f" (did you mean {hint[0]!r}?)" if hint else ""))
+    kwargs = {}
+    ok = True
+    for f in fields(cls):
+        if f.name in data:
+            n_err = len(errors)
+            kwargs[f.name] = _coerce(data[f.name], hints[f.name], f"{where}.{f.name}", errors)
+            ok &= len(errors) == n_err
+        elif f.default is MISSING and f.default_factory is MISSING:
+            if is_dataclass(hints[f.name]):
+                kwargs[f.name] = _parse(hints[f.name], {}, f"{where}.{f.name}", errors)
+            else:
+                errors.append(f"{where}.{f.name} is required")
+            ok &= kwargs.get(f.name) is not None
+    return cls(**kwargs) if ok else None
+
+
+# ------------------------------
+# Plan
+# ------------------------------
+
+_ELEMENT_COLS = 12          # t, index and 10 element columns in elements.parquet
+_BYTES_PER_CSV_VALUE = 24
+_ARCHIVE_BYTES_PER_PARTICLE = 512   # SimulationArchive blob, upper bound per particle
+_BYTES_PER_SENS_ROW = 1000          # dict rows buffered by Sensitivity until finalize
+
+
+@dataclass
+class Calibration:
+    steps: int
+    wall_s: float
+    substeps_per_step: float
+    est_total_s: float
+    force_share: dict[str, float] = field(default_factory=dict)  # fraction of step time per force
+
+
+@dataclass
+class RunPlan:
+    config: SimConfig
+    steps: int
+    n_bodies: int
+    n_flybys: int
+    n_outputs: int          # upper bound (dense windows may overlap)
+    n_diag: int
+    disk_bytes: int
+    memory_bytes: int
+    time_stats: dict | None = None   # TimeGrid.stats of the output times
+    calibration: Calibration | None = None
+    out_schedule: object = None      # sim.schedule.OutputSchedule of the planned run
+
+    def summary(self) -> str:
+        run = self.config.run
+        lines = [
+            f"Run {run.label!r}: {self.steps:,} steps of {run.dt_yr:g} yr ({run.duration_yr:g} yr)",
+            f"  bodies={self.n_bodies}, flybys={self.n_flybys}, outputs<={self.n_outputs:,}, "
+            f"diagnostic samples={self.n_diag:,}",
+            f"  estimated disk {_fmt_bytes(self.disk_bytes)}, peak output memory "
+            f"{_fmt_bytes(self.memory_bytes)} in {self.config.io.outdir}",
+        ]
+        ts = self.time_stats
+        if ts is not None:
+            lines.append(
+                f"  time base {ts['mode']}: max spacing jitter {ts['max_spacing_dev']:.2e} yr, "
+                f"max rounding {ts['max_rounding']:.2e} yr, dt change {ts['dt_rel_change']:+.1e}")
+        cal = self.calibration
+        if cal is not None:
+            lines.append(
+                f"  calibration: {cal.steps} steps in {cal.wall_s:.3f} s "
+                f"({cal.substeps_per_step:.1f} IAS15 substeps/step) -> est. {_fmt_seconds(cal.est_total_s)}")
+            if cal.force_share:
+                lines.append("  force share of step time: " + ", ".join(
+                    f"{name} {share:.0%}" for name, share in cal.force_share.items()))
+        return "\n".join(lines)
+
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "kB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def _fmt_seconds(s: float) -> str:
+    if s < 120:
+        return f"{s:.1f} s"
+    if s < 2 * 3600:
+        return f"{s / 60:.1f} min"
+    if s < 2 * 86400:
+        return f"{s / 3600:.1f} h"
+    return f"{s / 86400:.1f} d"
+
+
+def _physical_memory() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _existing_parent(path: Path) -> Path:
+    path = path.resolve()
+    while not path.exists():
+        path = path.parent
+    return path
+
+
+def _bodies_cfg(cfg: SimConfig) -> dict:
+    bodies = cfg.bodies.to_dict()
+    if cfg.run.smoke_stub:
+        bodies["smoke_stub"] = True
+    return bodies
+
+
+def _check_sensitivity(cfg: SimConfig, n_bodies: int, t_inject: list[float], errors: list[str]) -> None:
+    """Sensitivity targets must exist at t0: variations are attached before the loop."""
+    late = [f"{k} (t_inject={t:.4g} yr)" for k, t in enumerate(t_inject) if t > 0.0]
+    if late:
+        errors.append("sensitivity needs every flyby star present at t0, but these enter later: "
+                      + ", ".join(late))
+    for j, entry in enumerate(cfg.sensitivity.params):
+        where = f"sensitivity.params[{j}]"
+        if "body" in entry:
+            b = int(entry["body"])
+            if not 1 <= b <= n_bodies - 1:
+                errors.append(f"{where}: body {b} out of range 1..{n_bodies - 1}")
+        elif "flyby" in entry:
+            k = int(entry["flyby"])
+            if not 0 <= k < len(t_inject):
+                errors.append(f"{where}: flyby {k} does not exist ({len(t_inject)} flyby stars)")
+            elif t_inject[k] > 0.0:
+                errors.append(f"{where}: flyby {k} is not present at t0")
+
+
+def plan_run(cfg: SimConfig) -> RunPlan:
+    """Resolve counts, schedules and footprint; raise ``ConfigError`` on fatal problems."""
+    from .physics.initial_conditions import get_initial_states
+    from .physics.stellar_passages import Flyby, draw_flybys
+    from .sim.flyby_injection import AU_PER_KM, YR_PER_S, time_from_periapsis
+    from .sim.schedule import OutputSchedule
+
+    errors: list[str] = []
+    run = cfg.run
+    grid = cfg.time_grid
+    steps = grid.n_steps(run.duration_yr)
+    seed_rng = np.random.default_rng(run.seed_master)  # same draw sequence as the run
+    n_bodies = len(get_initial_states(_bodies_cfg(cfg), seed_rng))
+
+    flybys = draw_flybys(cfg.flybys.to_dict(), run.duration_yr, seed_rng)
+    if cfg.flybys.enabled and not flybys:
+        log.warning("flybys.enabled but no passages were drawn for this seed/duration")
+    r_inj = cfg.flybys.injection_radius_pc * AU_PER_PC
+    t_inject = [fb.t - time_from_periapsis(MU_SUN * (1.0 + fb.m), fb.v_inf, fb.b_pc * AU_PER_PC, r_inj)
+                for fb in flybys]
+    intr = cfg.intruder
+    if intr.enabled:
+        v_inf = intr.v_inf_kms * AU_PER_KM / YR_PER_S
+        t_peri = time_from_periapsis(MU_SUN * (1.0 + intr.mass_Msun), v_inf,
+                                     intr.impact_param_AU, intr.r_init_AU)
+        if t_peri > run.duration_yr:
+            log.warning("intruder reaches periapsis at t=%.4g yr, after the run ends (%.4g yr)",
+                        t_peri, run.duration_yr)
+        flybys.append(Flyby(t=t_peri, m=intr.mass_Msun, v_inf=v_inf,
+                            b_pc=intr.impact_param_AU / AU_PER_PC,
+                            nhat=np.array([0.0, 0.0, 1.0]), impulse_grad=math.nan))
+        t_inject.append(0.0)  # the intruder enters at t0
+    if cfg.sensitivity.enabled:
+        _check_sensitivity(cfg, n_bodies, t_inject, errors)
+
+    sched = OutputSchedule.from_config(run.to_dict(), flybys, 0.0, grid.dt, steps)
+    n_out = sched.estimate_count()
+    n_diag = steps // cfg.diag_every + 1
+    members = 1
+    if cfg.batch.enabled:
+        members = max(cfg.batch.members or 1, len(cfg.batch.overrides))
+    n_stars = len(flybys)  # upper bound on stars present at once
+
+    rows = n_out * max(n_bodies - 1, 0) * members
+    disk = rows * _ELEMENT_COLS * 8
+    disk += n_diag * 8 * _BYTES_PER_CSV_VALUE * members
+    if not cfg.batch.enabled:
+        disk += n_out * (n_bodies + n_stars) * _ARCHIVE_BYTES_PER_PARTICLE
+    memory = 0 if cfg.batch.enabled else 2 * rows * _ELEMENT_COLS * 8  # OutputWriter keeps frames
+    if cfg.sensitivity.enabled:
+        memory += n_out * len(cfg.sensitivity.params) * max(n_bodies - 1, 0) * _BYTES_PER_SENS_ROW
+    if cfg.batch.enabled:
+        memory += cfg.batch.chunk_outputs * members * n_bodies * 7 * 8
+
+    outdir = Path(cfg.io.outdir)
+    parent = _existing_parent(outdir)
+    if not os.access(parent, os.W_OK):
+        errors.append(f"io.outdir {outdir} is not writable ({parent})")
+    else:
+        free = shutil.disk_usage(parent).free
+        if disk > free:
+            errors.append(f"estimated output {_fmt_bytes(disk)} exceeds free disk {_fmt_bytes(free)} at {parent}")
+    phys = _physical_memory()
+    if phys is not None:
+        if memory > phys:
+            errors.append(f"estimated output memory {_fmt_bytes(memory)} exceeds physical memory {_fmt_bytes(phys)}")
+        elif memory > phys // 2:
+            log.warning("estimated output memory %s is over half of physical memory", _fmt_bytes(memory))
+    if errors:
+        raise ConfigError(errors)
+
+    return RunPlan(cfg, steps, n_bodies, len(flybys), n_out, n_diag, int(disk), int(memory),
+                   time_stats=grid.stats(steps, n_samples=20_000, n_exact=200), out_schedule=sched)
+
+
+def _stops(cfg: SimConfig, plan: RunPlan, steps: int) -> list[int]:
+    """The run's merged output/diagnostic stops, from the first one past t0 to ``steps`` beyond it."""
+    from .sim.schedule import OutputSchedule, merge_schedules
+
+    out_sched = plan.out_schedule or OutputSchedule.from_config(cfg.run.to_dict(), [], 0.0,
+                                                                cfg.time_grid.dt, plan.steps)
+    stops = []
+    for i, _ in merge_schedules(out_sched, OutputSchedule(plan.steps, cfg.diag_every)):
+        if i == 0:
+            continue
+        if stops and i > stops[0] + steps:
+            break
+        stops.append(i)
+    if len(stops) < 2:  # fewer than two scheduled stops: time the whole (short) run
+        stops = [1, plan.steps] if plan.steps > 1 else [0, 1]
+    return stops
+
+
+def _time_steps(cfg: SimConfig, stops: list[int], skip_forces=()) -> tuple[float, float, object]:
+    from .sim.driver import build_sim
+    from .sim.timegrid import TimeGrid
+
+    sim_cfg = cfg.to_dict()
+    sim_cfg["bodies"] = _bodies_cfg(cfg)
+    sim = build_sim(sim_cfg, np.random.default_rng(cfg.run.seed_master), skip_forces=skip_forces)
+    grid = TimeGrid.build(cfg.run.time_mode, cfg.run.dt_yr, cfg.run.duration_yr, t0=sim.t)
+    grid.advance(sim, stops[0])  # first interval pays IAS15 warm-up
+    n0 = sim.steps_done
+    wall0 = time.perf_counter()
+    for i in stops[1:]:
+        grid.advance(sim, i)
+    covered = max(stops[-1] - stops[0], 1)
+    return time.perf_counter() - wall0, (sim.steps_done - n0) / covered, sim
+
+
+def calibrate(cfg: SimConfig, plan: RunPlan | None = None, steps: int = 200) -> Calibration:
+    """Time about ``steps`` integration steps of the real body set and forces (no flybys, no I/O).
+
+    The sim is stopped only at the run's scheduled output and diagnostic steps,
+    as in the main loop: IAS15 takes longer substeps between sparse stops, so
+    stopping every step would overestimate the run time. At least one
+    scheduled interval is timed, after a first one for warm-up.
+
+    Each loaded force is also left out in turn (a single force against a
+    purely Newtonian run); its share is the fraction of step time saved, per
+    IAS15 substep so that a force changing the step size is not credited for it.
+    """
+    plan = plan if plan is not None else plan_run(cfg)
+    stops = _stops(cfg, plan, max(1, int(steps)))
+    steps = max(stops[-1] - stops[0], 1)
+    wall, substeps, sim = _time_steps(cfg, stops)
+    names = list(sim.contents["forces"].handles)
+    share = {}
+    per_sub = wall / (substeps * steps)
+    for name in names:
+        w, sub, _ = _time_steps(cfg, stops, skip_forces=[name])
+        share[name] = max(0.0, 1.0 - w / (sub * steps) / per_sub)
+    return Calibration(
+        steps=steps,
+        wall_s=wall,
+        substeps_per_step=substeps,
+        est_total_s=wall / steps * plan.steps,
+        force_share=share,
+    )
@@ -0,0 +1,267 @@
+"""Shared-memory ring buffer of the latest run snapshots for live monitoring.
+
+The driver publishes particle state, osculating elements and conservation
+diagnostics into a ``multiprocessing.shared_memory`` block. Each slot is
+guarded by a sequence number (odd while being written, even when complete),
+so the writer never waits on readers and a reader simply retries if a slot
+changed under it. Nothing touches the filesystem on the publishing path.
+
+Monitor a running job (the block name, ``sfs_<label>_<pid>`` by default, is
+logged at startup):
+    python -m solar_flyby_sim.io.live sfs_withstars_12345 --interval 2
+    python -m solar_flyby_sim.io.live sfs_withstars_12345 --plot a
+"""
+from __future__ import annotations
+import argparse
+import logging
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+log = logging.getLogger("solar_flyby_sim.live")
+
+_MAGIC = 0x53465352  # "SFSR"
+_HEADER = 8          # int64: magic, slots, max_particles, head, reserved...
+ELEMENT_COLS = ("a", "e", "i", "Omega", "omega", "M")
+DIAG_COLS = ("E", "max_dE", "max_dL", "n_samples")
+
+
+def _layout(slots: int, nmax: int) -> tuple[dict, int]:
+    """Byte offsets and shapes of each array in the block."""
+    fields = [
+        ("header", np.int64, (_HEADER,)),
+        ("seq", np.int64, (slots,)),
+        ("t", np.float64, (slots,)),
+        ("n", np.int64, (slots,)),
+        ("m", np.float64, (slots, nmax)),
+        ("xv", np.float64, (slots, 6 * nmax)),
+        ("elems", np.float64, (slots, nmax, len(ELEMENT_COLS))),
+        ("diag", np.float64, (slots, len(DIAG_COLS))),
+    ]
+    out, offset = {}, 0
+    for name, dtype, shape in fields:
+        out[name] = (offset, dtype, shape)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return out, offset
+
+
+class SnapshotRing:
+    """Fixed-capacity ring of snapshots in shared memory.
+
+    Create with ``SnapshotRing(name, slots, max_particles)`` in the run and
+    ``SnapshotRing.attach(name)`` in a monitor. Arrays are numpy views on the
+    shared block, so attaching copies nothing.
+    """
+
+    def __init__(self, name: str, slots: int = 64, max_particles: int = 64,
+                 _shm: shared_memory.SharedMemory | None = None):
+        self.owner = _shm is None
+        if self.owner:
+            layout, size = _layout(slots, max_particles)
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                # Another run may own it; never take over a block we did not create
+                raise FileExistsError(
+                    f"Shared memory block {name!r} already exists (another run, or left over "
+                    f"from a crashed one); choose another live.name or remove /dev/shm/{name}"
+                ) from None
+        else:
+            self._shm = _shm
+            hdr = np.ndarray((_HEADER,), np.int64, self._shm.buf)
+            if hdr[0] != _MAGIC:
+                raise ValueError(f"Shared memory block {name!r} is not a snapshot ring")
+            slots, max_particles = int(hdr[1]), int(hdr[2])
+            layout, _ = _layout(slots, max_particles)
+        self.name = name
+        self.slots = int(slots)
+        self.max_particles = int(max_particles)
+        for key, (offset, dtype, shape) in layout.items():
+            setattr(self, f"_{key}", np.ndarray(shape, dtype, self._shm.buf, offset))
+        if self.owner:
+            self._seq[:] = 0
+            self._header[:] = 0
+            self._header[1], self._header[2] = self.slots, self.max_particles
+            self._header[0] = _MAGIC
+        self._warned_truncate = False
+
+    @classmethod
+    def attach(cls, name: str) -> "SnapshotRing":
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            # Readers must not unlink the writer's block when they exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(name, _shm=shm)
+
+    @property
+    def head(self) -> int:
+        """Number of snapshots published so far."""
+        return int(self._header[3])
+
+    # ------------------------------
+    # Writer
+    # ------------------------------
+
+    def publish(self, sim, elems=None, diag=None) -> None:
+        """Copy the current state of ``sim`` into the next slot (never blocks).
+
+        ``elems`` is the DataFrame from ``compute_elements`` (with an ``index``
+        column); ``diag`` is the run's ``Diagnostics``.
+        """
+        k = self.head % self.slots
+        N = int(sim.N)
+        if N > self.max_particles:
+            if not self._warned_truncate:
+                log.warning("Live ring holds %d particles; truncating N=%d", self.max_particles, N)
+                self._warned_truncate = True
+            N = self.max_particles
+
+        self._seq[k] += 1  # odd: slot being written
+        self._t[k] = sim.t
+        self._n[k] = N
+        if N == sim.N:
+            sim.serialize_particle_data(m=self._m[k], xyzvxvyvz=self._xv[k, :6 * N])
+        else:
+            for j in range(N):
+                p = sim.particles[j]
+                self._m[k, j] = p.m
+                self._xv[k, 6 * j:6 * j + 6] = (p.x, p.y, p.z, p.vx, p.vy, p.vz)
+        el = self._elems[k]
+        el[:N] = np.nan
+        if elems is not None and len(elems):
+            idx = elems["index"].to_numpy()
+            ok = idx < N
+            el[idx[ok]] = elems.loc[ok, list(ELEMENT_COLS)].to_numpy()
+        if diag is not None:
+            E = diag.E_last if diag.E_last is not None else np.nan
+            self._diag[k] = (E, diag.max_dE, diag.max_dL, diag.n_samples)
+        else:
+            self._diag[k] = np.nan
+        self._seq[k] += 1  # even: complete
+        self._header[3] += 1
+
+    def close(self) -> None:
+        # Drop our views before closing the mapping
+        for key in ("header", "seq", "t", "n", "m", "xv", "elems", "diag"):
+            setattr(self, f"_{key}", None)
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------
+    # Reader
+    # ------------------------------
+
+    def read(self, seqno: int, retries: int = 100) -> dict | None:
+        """Consistent copy of snapshot number ``seqno`` (0-based), or None if overwritten."""
+        for _ in range(retries):
+            head = self.head
+            if seqno >= head or seqno < head - self.slots:
+                return None
+            k = seqno % self.slots
+            # Each write of slot k adds 2, so snapshot seqno leaves it at this value
+            expect = 2 * (seqno // self.slots + 1)
+            s1 = int(self._seq[k])
+            if s1 & 1:
+                continue
+            if s1 != expect:
+                return None  # overwritten by a later lap (head may not show it yet)
+            N = int(self._n[k])
+            snap = {
+                "seqno": seqno,
+                "t": float(self._t[k]),
+                "N": N,
+                "m": self._m[k, :N].copy(),
+                "xv": self._xv[k, :6 * N].reshape(N, 6).copy(),
+                "elems": self._elems[k, :N].copy(),
+                "diag": dict(zip(DIAG_COLS, self._diag[k].tolist())),
+            }
+            # Slot unchanged while copying
+            if int(self._seq[k]) == s1:
+                return snap
+        return None
+
+    def latest(self) -> dict | None:
+        head = self.head
+        return self.read(head - 1) if head else None
+
+    def history(self) -> list[dict]:
+        """All snapshots still held in the ring, oldest first."""
+        head = self.head
+        snaps = (self.read(s) for s in range(max(0, head - self.slots), head))
+        return [s for s in snaps if s is not None]
+
+
+# ------------------------------
+# Monitor CLI
+# ------------------------------
+
+def _print_snapshot(snap: dict) -> None:
+    d = snap["diag"]
+    a = snap["elems"][1:, 0]
+    e = snap["elems"][1:, 1]
+    log.info("#%d t=%.6g yr N=%d max|dE/E0|=%.3e max|dL/L0|=%.3e  a[1:4]=%s e[1:4]=%s",
+             snap["seqno"], snap["t"], snap["N"], d["max_dE"], d["max_dL"],
+             np.array2string(a[:3], precision=6), np.array2string(e[:3], precision=4))
+
+
+def _plot_live(ring: SnapshotRing, col: str, interval: float) -> None:
+    import matplotlib.pyplot as plt
+
+    j = ELEMENT_COLS.index(col)
+    plt.ion()
+    fig, ax = plt.subplots(figsize=(9, 4))
+    ax.set(xlabel="Time [yr]", ylabel=col, title=f"{ring.name}: live {col}")
+    ax.grid(True)
+    lines: dict = {}
+    while plt.fignum_exists(fig.number):
+        hist = ring.history()
+        if hist:
+            t = np.array([s["t"] for s in hist])
+            nb = max(s["N"] for s in hist)
+            vals = np.full((len(hist), nb), np.nan)
+            for r, s in enumerate(hist):
+                vals[r, :s["N"]] = s["elems"][:, j]
+            for b in range(1, nb):
+                if b not in lines:
+                    (lines[b],) = ax.plot([], [], lw=1)
+                lines[b].set_data(t, vals[:, b])
+            ax.relim()
+            ax.autoscale_view()
+        plt.pause(interval)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Attach to a running simulation's snapshot ring")
+    ap.add_argument("name", help="shared memory block name (see run log)")
+    ap.add_argument("--interval", type=float, default=1.0, help="poll interval [s]")
+    ap.add_argument("--plot", choices=ELEMENT_COLS, default=None, help="live plot of one element")
+    args = ap.parse_args()
+
+    ring = SnapshotRing.attach(args.name)
+    try:
+        if args.plot:
+            _plot_live(ring, args.plot, args.interval)
+            return
+        last = -1
+        while True:
+            snap = ring.latest()
+            if snap is not None and snap["seqno"] != last:
+                _print_snapshot(snap)
+                last = snap["seqno"]
+            time.sleep(args.interval)
+    except (KeyboardInterrupt, FileNotFoundError):
+        pass
+    finally:
+        ring.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
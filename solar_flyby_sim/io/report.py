@@ -1 +1,337 @@
-"""Step 10: build HTML report per run with plots and metrics."""
\ No newline at end of file
+"""Step 10: build HTML report per run with plots and metrics.
+
+Reports are incremental. Every artifact (plot, metric table, summary) records
+a fingerprint of its inputs -- the run tables it reads (size + mtime) and a
+hash of the source modules that produce it -- in ``report/manifest.json``.
+Only artifacts whose fingerprint changed are rebuilt.
+
+Each run also caches ``report/summary.json``; the ensemble index page is
+built from those summaries alone and never touches the raw outputs.
+
+Usage:
+    python -m solar_flyby_sim.io.report outputs/* --index outputs/index.html --jobs 8
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import html
+import inspect
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+import numpy as np
+import pandas as pd
+
+from ..plots import decimate, streaming
+from ..plots import energy_conservation, quicklook_plot
+from ..plots.streaming import find_table, iter_chunks, table_columns
+
+log = logging.getLogger("solar_flyby_sim.report")
+
+REPORT_DIR = "report"
+MANIFEST = "manifest.json"
+SUMMARY = "summary.json"
+ELEMENT_STATS = "elements_summary.csv"
+
+
+@dataclass
+class Artifact:
+    name: str                 # output file name inside the report dir
+    tables: tuple[str, ...]   # run table stems this artifact reads
+    build: Callable[[Path, Path], None]  # (run_dir, out_path) -> None
+    modules: tuple = field(default_factory=tuple)  # code it depends on
+
+
+# ------------------------------
+# Fingerprints
+# ------------------------------
+
+_code_hash_cache: dict = {}
+
+
+def _code_version(modules) -> str:
+    h = hashlib.sha1()
+    for mod in (*modules, sys.modules[__name__]):
+        key = mod.__name__
+        if key not in _code_hash_cache:
+            _code_hash_cache[key] = hashlib.sha1(inspect.getsource(mod).encode()).hexdigest()
+        h.update(_code_hash_cache[key].encode())
+    return h.hexdigest()
+
+
+def _fingerprint(run_dir: Path, art: Artifact) -> dict | None:
+    """Inputs + code version of ``art``; None if none of its tables exist."""
+    inputs = {}
+    for stem in art.tables:
+        try:
+            st = find_table(run_dir, stem).stat()
+        except FileNotFoundError:
+            inputs[stem] = None
+            continue
+        inputs[stem] = [st.st_size, st.st_mtime_ns]
+    if all(v is None for v in inputs.values()):
+        return None
+    return {"inputs": inputs, "code": _code_version(art.modules)}
+
+
+# ------------------------------
+# Artifact builders
+# ------------------------------
+
+def _save_fig(fig, out_path: Path) -> None:
+    import matplotlib.pyplot as plt
+    fig.savefig(out_path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+def _element_plot(col: str, ylabel: str) -> Callable[[Path, Path], None]:
+    def build(run_dir: Path, out_path: Path) -> None:
+        _save_fig(quicklook_plot.plot_elem(find_table(run_dir, "elements"), col, ylabel), out_path)
+    return build
+
+
+def _conservation_plot(stem: str, quantity: str) -> Callable[[Path, Path], None]:
+    def build(run_dir: Path, out_path: Path) -> None:
+        fig = energy_conservation.plot_series(find_table(run_dir, stem), quantity, True)
+        _save_fig(fig, out_path)
+    return build
+
+
+def element_stats(path: Path) -> pd.DataFrame:
+    """First/last/min/max of a, e, i per body, streamed over row groups."""
+    cols = table_columns(path)
+    time_col, name_col = quicklook_plot._time_and_name(cols)
+    if name_col is None:
+        raise ValueError(f"No body id column in {path}")
+    elems = [c for c in ("a", "e", "i") if c in cols]
+    parts = []
+    for chunk in iter_chunks(path, [time_col, name_col, *elems]):
+        parts.append(chunk.groupby(name_col, sort=False)[elems].agg(["first", "last", "min", "max"]))
+    part = pd.concat(parts)
+    out = {}
+    for c in elems:
+        g = part[c].groupby(level=0)
+        out[(c, "first")] = g["first"].first()
+        out[(c, "last")] = g["last"].last()
+        out[(c, "min")] = g["min"].min()
+        out[(c, "max")] = g["max"].max()
+        out[(c, "delta")] = out[(c, "last")] - out[(c, "first")]
+    df = pd.DataFrame(out)
+    df.index.name = name_col
+    return df
+
+
+def _build_element_stats(run_dir: Path, out_path: Path) -> None:
+    element_stats(find_table(run_dir, "elements")).to_csv(out_path)
+
+
+def _relative_drift(path: Path, cols: list[str], norm: bool) -> dict:
+    """Streaming first value, sample count, time span and max |Δx/x0|.
+
+    x0 is re-anchored at each constant-N ``segment`` (flyby star in/out).
+    """
+    anchor = energy_conservation._SegmentAnchor()
+    t0, t1, n, worst = None, None, 0, 0.0
+    for chunk in iter_chunks(path, energy_conservation._with_segment(path, cols)):
+        if chunk.empty:
+            continue
+        x = energy_conservation._L_norm(chunk) if norm else chunk[cols[1]].to_numpy(dtype=float)
+        if t0 is None:
+            t0 = float(chunk[cols[0]].iat[0])
+        worst = max(worst, float(np.nanmax(np.abs(anchor.rel(x, chunk.get("segment"))))))
+        t1 = float(chunk[cols[0]].iat[-1])
+        n += len(chunk)
+    return {"first": anchor.first, "t_start": t0, "t_end": t1, "n": n, "max_rel_drift": worst}
+
+
+def run_summary(run_dir: Path) -> dict:
+    """Per-run scalars for the ensemble index (computed once, then cached)."""
+    summary: dict = {"run": run_dir.name}
+    try:
+        path = find_table(run_dir, "energy")
+        t_col, e_col = energy_conservation._energy_columns(path)
+        d = _relative_drift(path, [t_col, e_col], norm=False)
+        summary.update(n_diag_samples=d["n"], t_start=d["t_start"], t_end=d["t_end"],
+                       E0=d["first"], max_dE_rel=d["max_rel_drift"])
+    except FileNotFoundError:
+        pass
+    try:
+        path = find_table(run_dir, "angmom")
+        d = _relative_drift(path, energy_conservation._angmom_columns(path), norm=True)
+        summary.update(L0=d["first"], max_dL_rel=d["max_rel_drift"])
+    except FileNotFoundError:
+        pass
+    try:
+        path = find_table(run_dir, "elements")
+        # energy.csv follows diagnostics.every_steps; outputs are the element snapshots
+        t_col, name_col = quicklook_plot._time_and_name(table_columns(path))
+        times, ids = set(), set()
+        for chunk in iter_chunks(path, [t_col] + ([name_col] if name_col else [])):
+            times.update(chunk[t_col].unique().tolist())
+            if name_col is not None:
+                ids.update(chunk[name_col].unique().tolist())
+        summary["n_outputs"] = len(times)
+        if name_col is not None:
+            summary["n_bodies"] = len(ids)
+    except FileNotFoundError:
+        pass
+    return summary
+
+
+def _build_summary(run_dir: Path, out_path: Path) -> None:
+    out_path.write_text(json.dumps(run_summary(run_dir), indent=2))
+
+
+_PLOT_MODULES = (quicklook_plot, energy_conservation, decimate, streaming)
+
+ARTIFACTS: list[Artifact] = [
+    Artifact("elements_a.png", ("elements",), _element_plot("a", "a [AU]"), _PLOT_MODULES),
+    Artifact("elements_e.png", ("elements",), _element_plot("e", "e"), _PLOT_MODULES),
+    Artifact("elements_i.png", ("elements",), _element_plot("i", "i [rad]"), _PLOT_MODULES),
+    Artifact("energy_frac.png", ("energy",), _conservation_plot("energy", "E"), _PLOT_MODULES),
+    Artifact("L_frac.png", ("angmom",), _conservation_plot("angmom", "L"), _PLOT_MODULES),
+    Artifact(ELEMENT_STATS, ("elements",), _build_element_stats, (quicklook_plot, streaming)),
+    Artifact(SUMMARY, ("elements", "energy", "angmom"), _build_summary,
+             (energy_conservation, quicklook_plot, streaming)),
+]
+
+
+# ------------------------------
+# HTML
+# ------------------------------
+
+_CSS = ("body{font-family:sans-serif;margin:2em;max-width:1100px}"
+        "table{border-collapse:collapse;font-size:0.85em}"
+        "td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}"
+        "img{max-width:100%}")
+
+
+def _page(title: str, body: str) -> str:
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+            f"<style>{_CSS}</style></head><body><h1>{html.escape(title)}</h1>{body}</body></html>\n")
+
+
+def _fmt(v) -> str:
+    if isinstance(v, float):
+        return f"{v:.6g}"
+    return html.escape(str(v))
+
+
+def _run_page(run_dir: Path, report_dir: Path) -> str:
+    parts = []
+    summary_path = report_dir / SUMMARY
+    if summary_path.exists():
+        summary = json.loads(summary_path.read_text())
+        rows = "".join(f"<tr><th>{html.escape(k)}</th><td>{_fmt(v)}</td></tr>" for k, v in summary.items())
+        parts.append(f"<h2>Summary</h2><table>{rows}</table>")
+    imgs = [a.name for a in ARTIFACTS if a.name.endswith(".png") and (report_dir / a.name).exists()]
+    if imgs:
+        parts.append("<h2>Plots</h2>" + "".join(f"<p><img src='{n}'></p>" for n in imgs))
+    stats_path = report_dir / ELEMENT_STATS
+    if stats_path.exists():
+        stats = pd.read_csv(stats_path, header=[0, 1], index_col=0)
+        parts.append("<h2>Elements</h2>" + stats.to_html(float_format=lambda x: f"{x:.6g}"))
+    return _page(f"Run report: {run_dir.name}", "".join(parts))
+
+
+# ------------------------------
+# Public API
+# ------------------------------
+
+def build_report(run_dir: Path, force: bool = False) -> Path:
+    """Rebuild stale artifacts of one run and write ``report/index.html``."""
+    run_dir = Path(run_dir)
+    report_dir = run_dir / REPORT_DIR
+    report_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = report_dir / MANIFEST
+    manifest = {} if force or not manifest_path.exists() else json.loads(manifest_path.read_text())
+
+    rebuilt = 0
+    for art in ARTIFACTS:
+        fp = _fingerprint(run_dir, art)
+        out_path = report_dir / art.name
+        if fp is None:
+            log.debug("%s: skipping %s (missing inputs)", run_dir.name, art.name)
+            continue
+        if manifest.get(art.name) == fp and out_path.exists():
+            continue
+        try:
+            art.build(run_dir, out_path)
+        except (ValueError, KeyError) as e:
+            log.warning("%s: could not build %s (%s)", run_dir.name, art.name, e)
+            manifest.pop(art.name, None)
+            continue
+        manifest[art.name] = fp
+        rebuilt += 1
+
+    page = report_dir / "index.html"
+    if rebuilt or not page.exists():
+        page.write_text(_run_page(run_dir, report_dir))
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    log.info("%s: report up to date (%d artifact(s) rebuilt)", run_dir.name, rebuilt)
+    return page
+
+
+def _build_report_worker(run_dir: Path, force: bool) -> Path:
+    import matplotlib
+    matplotlib.use("Agg")
+    return build_report(run_dir, force)
+
+
+def build_reports(run_dirs, jobs: int | None = None, force: bool = False) -> list[Path]:
+    """Build reports for many runs in parallel (one run per worker task)."""
+    run_dirs = [Path(d) for d in run_dirs]
+    jobs = min(len(run_dirs), jobs or os.cpu_count() or 1)
+    if jobs <= 1:
+        return [_build_report_worker(d, force) for d in run_dirs]
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        return list(ex.map(_build_report_worker, run_dirs, [force] * len(run_dirs)))
+
+
+def build_index(run_dirs, index_path: Path) -> Path:
+    """Ensemble index from each run's cached ``summary.json``."""
+    index_path = Path(index_path)
+    rows = []
+    for d in map(Path, run_dirs):
+        summary_path = d / REPORT_DIR / SUMMARY
+        if not summary_path.exists():
+            log.warning("No cached summary for %s; build its report first", d)
+            continue
+        summary = json.loads(summary_path.read_text())
+        summary["report"] = os.path.relpath(d / REPORT_DIR / "index.html", index_path.parent)
+        rows.append(summary)
+
+    keys = ["run"] + sorted({k for r in rows for k in r} - {"run", "report"})
+    head = "".join(f"<th>{html.escape(k)}</th>" for k in keys)
+    body = "".join(
+        "<tr>" + f"<td><a href='{html.escape(r['report'])}'>{html.escape(str(r['run']))}</a></td>"
+        + "".join(f"<td>{_fmt(r.get(k, ''))}</td>" for k in keys[1:]) + "</tr>"
+        for r in rows
+    )
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    index_path.write_text(_page(f"Ensemble ({len(rows)} runs)", f"<table><tr>{head}</tr>{body}</table>"))
+    return index_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build incremental HTML run reports")
+    ap.add_argument("run_dirs", nargs="+", type=Path)
+    ap.add_argument("--index", type=Path, default=None, help="write ensemble index page here")
+    ap.add_argument("--jobs", type=int, default=None)
+    ap.add_argument("--force", action="store_true", help="rebuild every artifact")
+    args = ap.parse_args()
+
+    run_dirs = [d for d in args.run_dirs if d.is_dir()]
+    build_reports(run_dirs, jobs=args.jobs, force=args.force)
+    if args.index is not None:
+        log.info("Index written to %s", build_index(run_dirs, args.index))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -4,5 +4,7 @@ import numpy as np
 MU_SUN = 4 * np.pi**2          # AU^3 / yr^2
 C_AU_PER_YR = 63239.7263       # Speed of light in AU/yr
 R_SUN_AU = 0.00465047          # Solar equatorial radius in AU
+AU_PER_PC = 206264.806         # 1 parsec in AU
 J2_SUN_DEFAULT = 2.2e-7        # Typical solar J2 (document source in README or comment)
+SOLAR_MDOT_DEFAULT = 9.1e-14   # Msun/yr: radiation L/c^2 (~6.8e-14) + solar wind (~2.3e-14)
 
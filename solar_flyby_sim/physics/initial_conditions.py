@@ -109,7 +109,11 @@ def get_initial_states(cfg_bodies: dict, rng: np.random.Generator) -> list[BodyS
       - elements_csv (optional): path to CSV with elements. If omitted, default to
         `solar_flyby_sim/data/j2000_elements.csv`. If missing, use smoke stub.
       - use_default_list (bool): if True (default), filter rows to our canonical list.
+      - smoke_stub (bool): use the Sun+Earth stub without reading the CSV.
     """
+    if cfg_bodies.get("smoke_stub", False):
+        return _smoke_stub_states()
+
     csv_path = cfg_bodies.get("elements_csv")
     csv_path = Path(csv_path) if csv_path else Path("solar_flyby_sim/data/j2000_elements.csv")
 
@@ -5,6 +5,7 @@ Step 4 will implement:
 - Rickman speed sampling; 1 pc injection; impact b≤0.1 pc
 - return list of passages with (t, M*, v_inf, b, direction) + impulse gradient
 """
+from __future__ import annotations
 from dataclasses import dataclass
 import numpy as np
 
@@ -16,6 +17,7 @@ class Flyby:
     b_pc: float   # pc
     nhat: np.ndarray  # direction vector
     impulse_grad: float
+    bhat: np.ndarray | None = None  # impact direction (⟂ nhat); random if None
 
 
 def draw_flybys(config, duration_yr: float, rng: np.random.Generator) -> list[Flyby]:
@@ -0,0 +1,136 @@
+"""Min/max-per-pixel decimation for long time series.
+
+A line plot cannot show more than one vertical span per horizontal pixel, so
+each series is reduced to the minimum and maximum sample inside each of
+``n_bins`` equal-width x bins (the envelope a full-resolution render would
+draw). Reducers accept data chunk by chunk so a table never has to be held
+in memory at full resolution; they need the global x range up front (e.g.
+``streaming.column_range``) so every chunk is binned on the same edges.
+"""
+from __future__ import annotations
+import numpy as np
+
+DEFAULT_BINS = 2000  # ~ figure width in pixels at 200 dpi
+
+
+def _bin_index(x: np.ndarray, x0: float, span: float, n_bins: int) -> np.ndarray:
+    if span <= 0.0:
+        return np.zeros(x.size, dtype=np.int64)
+    bins = ((x - x0) * (n_bins / span)).astype(np.int64)
+    np.clip(bins, 0, n_bins - 1, out=bins)
+    return bins
+
+
+def minmax_decimate(x, y, n_bins: int = DEFAULT_BINS) -> tuple[np.ndarray, np.ndarray]:
+    """Keep the min and max sample of ``y`` in each of ``n_bins`` x bins.
+
+    Non-finite samples are dropped. The returned points keep their original
+    order, so a time-ordered input stays time-ordered.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ok = np.isfinite(x) & np.isfinite(y)
+    if not ok.all():
+        x, y = x[ok], y[ok]
+    if x.size <= 2 * n_bins:
+        return x, y
+
+    x0, x1 = x.min(), x.max()
+    span = x1 - x0
+    if span <= 0.0:
+        keep = np.array([np.argmin(y), np.argmax(y)])
+    else:
+        bins = _bin_index(x, x0, span, n_bins)
+        if np.all(bins[1:] >= bins[:-1]):
+            # Time-ordered input: bins are contiguous runs, reduce them in place
+            starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+            seg = np.cumsum(np.r_[False, bins[1:] != bins[:-1]])
+            hit_min = np.flatnonzero(y == np.minimum.reduceat(y, starts)[seg])
+            hit_max = np.flatnonzero(y == np.maximum.reduceat(y, starts)[seg])
+            keep = np.concatenate([
+                hit_min[np.unique(seg[hit_min], return_index=True)[1]],
+                hit_max[np.unique(seg[hit_max], return_index=True)[1]],
+            ])
+        else:
+            # Sort by (bin, y): the first entry of each bin is its min, the last its max
+            order = np.lexsort((y, bins))
+            b_sorted = bins[order]
+            starts = np.flatnonzero(np.r_[True, b_sorted[1:] != b_sorted[:-1]])
+            ends = np.r_[starts[1:], b_sorted.size] - 1
+            keep = np.concatenate([order[starts], order[ends]])
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+class MinMaxReducer:
+    """Streaming min/max decimation of one series fed in chunks.
+
+    Bins have fixed edges over ``x_range``, and each keeps its running min and
+    max sample across chunks, so the result is the exact per-bin envelope of
+    the whole series in O(n_bins) memory.
+    """
+
+    def __init__(self, x_range: tuple[float, float], n_bins: int = DEFAULT_BINS):
+        self.n_bins = int(n_bins)
+        self.x0 = float(x_range[0])
+        self.span = float(x_range[1]) - self.x0
+        self._ymin = np.full(self.n_bins, np.inf)
+        self._ymax = np.full(self.n_bins, -np.inf)
+        self._xmin = np.full(self.n_bins, np.nan)
+        self._xmax = np.full(self.n_bins, np.nan)
+
+    def update(self, x, y) -> None:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        ok = np.isfinite(x) & np.isfinite(y)
+        if not ok.all():
+            x, y = x[ok], y[ok]
+        if not x.size:
+            return
+        bins = _bin_index(x, self.x0, self.span, self.n_bins)
+        # Sort by (bin, y): the first entry of each bin is its min, the last its max
+        order = np.lexsort((y, bins))
+        b_sorted = bins[order]
+        starts = np.flatnonzero(np.r_[True, b_sorted[1:] != b_sorted[:-1]])
+        ends = np.r_[starts[1:], b_sorted.size] - 1
+        b = b_sorted[starts]
+        i_min, i_max = order[starts], order[ends]
+        lower = y[i_min] < self._ymin[b]   # strict: earlier chunks win ties
+        self._ymin[b[lower]] = y[i_min[lower]]
+        self._xmin[b[lower]] = x[i_min[lower]]
+        higher = y[i_max] > self._ymax[b]
+        self._ymax[b[higher]] = y[i_max[higher]]
+        self._xmax[b[higher]] = x[i_max[higher]]
+
+    def result(self) -> tuple[np.ndarray, np.ndarray]:
+        filled = np.isfinite(self._ymin)
+        x = np.concatenate([self._xmin[filled], self._xmax[filled]])
+        y = np.concatenate([self._ymin[filled], self._ymax[filled]])
+        order = np.lexsort((y, x))
+        x, y = x[order], y[order]
+        keep = np.r_[True, (x[1:] != x[:-1]) | (y[1:] != y[:-1])]  # one-sample bins
+        return x[keep], y[keep]
+
+
+class GroupedReducer:
+    """One ``MinMaxReducer`` per group key (e.g. per body index), all on the same bins."""
+
+    def __init__(self, x_range: tuple[float, float], n_bins: int = DEFAULT_BINS):
+        self.x_range = x_range
+        self.n_bins = int(n_bins)
+        self.groups: dict = {}
+
+    def update(self, keys, x, y) -> None:
+        keys = np.asarray(keys)
+        order = np.argsort(keys, kind="stable")  # stable: keeps time order per key
+        uniq, starts = np.unique(keys[order], return_index=True)
+        x = np.asarray(x)[order]
+        y = np.asarray(y)[order]
+        for key, lo, hi in zip(uniq.tolist(), starts, np.r_[starts[1:], keys.size]):
+            red = self.groups.get(key)
+            if red is None:
+                red = self.groups[key] = MinMaxReducer(self.x_range, self.n_bins)
+            red.update(x[lo:hi], y[lo:hi])
+
+    def results(self) -> dict:
+        return {key: red.result() for key, red in sorted(self.groups.items())}
@@ -1,73 +1,146 @@
 from __future__ import annotations
 import argparse
+import logging
 from pathlib import Path
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from .decimate import DEFAULT_BINS, MinMaxReducer
+from .streaming import column_range, find_table, iter_chunks, render_parallel, table_columns
+
+log = logging.getLogger("solar_flyby_sim.plots.energy")
+
 DEFAULT_OUTDIR = Path("outputs/smoke")
 
-def _load_table(outdir: Path, stem: str) -> pd.DataFrame:
-    pqt, csv = outdir / f"{stem}.parquet", outdir / f"{stem}.csv"
-    if pqt.exists(): return pd.read_parquet(pqt)
-    if csv.exists(): return pd.read_csv(csv)
-    raise FileNotFoundError(f"Missing {stem}.parquet/csv in {outdir}")
 
-def _extract_energy(df: pd.DataFrame):
-    if {"t","E"}.issubset(df.columns):   return df["t"].to_numpy(), df["E"].to_numpy()
-    if {"time","total_energy"}.issubset(df.columns): return df["time"].to_numpy(), df["total_energy"].to_numpy()
+def _energy_columns(path: Path) -> tuple[str, str]:
+    cols = set(table_columns(path))
+    if {"t", "E"}.issubset(cols):
+        return "t", "E"
+    if {"time", "total_energy"}.issubset(cols):
+        return "time", "total_energy"
     raise ValueError("Energy needs (t,E) or (time,total_energy)")
 
-def _extract_L(df: pd.DataFrame):
-    t = df["time"].to_numpy() if "time" in df.columns else df["t"].to_numpy()
-    for c in ("Lx","Ly","Lz"):
-        if c not in df.columns: raise ValueError("AngMom needs Lx,Ly,Lz")
-    L = np.sqrt(df["Lx"]**2 + df["Ly"]**2 + df["Lz"]**2).to_numpy()
-    return t, L
+
+def _angmom_columns(path: Path) -> list[str]:
+    cols = set(table_columns(path))
+    if not {"Lx", "Ly", "Lz"}.issubset(cols):
+        raise ValueError("AngMom needs Lx,Ly,Lz")
+    return ["time" if "time" in cols else "t", "Lx", "Ly", "Lz"]
+
+
+class _SegmentAnchor:
+    """Streaming (x - x0) / |x0| with x0 the first sample of each constant-N segment.
+
+    Diagnostics start a new ``segment`` when a flyby star enters or leaves, since
+    E and L jump there; tables without the column are a single segment.
+    """
+
+    def __init__(self):
+        self.first: float | None = None
+        self._seg = None
+        self._x0 = None
+
+    def rel(self, x: np.ndarray, seg: np.ndarray | None) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        if x.size == 0:
+            return x
+        seg = np.zeros(x.size, dtype=np.int64) if seg is None else np.asarray(seg)
+        if self.first is None:
+            self.first = float(x[0])
+        start = np.empty(x.size, dtype=bool)
+        start[0] = self._seg is None or seg[0] != self._seg
+        start[1:] = seg[1:] != seg[:-1]
+        idx = np.maximum.accumulate(np.where(start, np.arange(x.size), 0))
+        x0 = x[idx]
+        if not start[0]:  # rows before the first new segment continue the previous chunk's
+            x0[~np.logical_or.accumulate(start)] = self._x0
+        self._seg, self._x0 = seg[-1], x0[-1]
+        scale = np.abs(x0)
+        scale[scale == 0] = 1.0
+        return (x - x0) / scale
+
+
+def _with_segment(path: Path, cols: list[str]) -> list[str]:
+    return cols + ["segment"] if "segment" in table_columns(path) else cols
+
+
+def _L_norm(chunk) -> np.ndarray:
+    return np.sqrt(chunk["Lx"].to_numpy()**2 + chunk["Ly"].to_numpy()**2 + chunk["Lz"].to_numpy()**2)
+
+
+def reduce_energy(path: Path, n_bins: int = DEFAULT_BINS, fractional: bool = False):
+    """Decimated (t, E), or (t, ΔE/|E0|) re-anchored per constant-N segment."""
+    t_col, e_col = _energy_columns(path)
+    red, anchor = MinMaxReducer(column_range(path, t_col), n_bins), _SegmentAnchor()
+    for chunk in iter_chunks(path, _with_segment(path, [t_col, e_col])):
+        E = chunk[e_col].to_numpy()
+        if fractional:
+            E = anchor.rel(E, chunk.get("segment"))
+        red.update(chunk[t_col].to_numpy(), E)
+    return red.result()
+
+
+def reduce_L(path: Path, n_bins: int = DEFAULT_BINS, fractional: bool = False):
+    """Decimated (t, |L|), or (t, Δ|L|/|L0|) re-anchored per constant-N segment."""
+    cols = _angmom_columns(path)
+    red, anchor = MinMaxReducer(column_range(path, cols[0]), n_bins), _SegmentAnchor()
+    for chunk in iter_chunks(path, _with_segment(path, cols)):
+        L = _L_norm(chunk)
+        if fractional:
+            L = anchor.rel(L, chunk.get("segment"))
+        red.update(chunk[cols[0]].to_numpy(), L)
+    return red.result()
+
+
+def plot_series(path: Path, quantity: str, fractional: bool, n_bins: int = DEFAULT_BINS):
+    """Render one of the four conservation figures ('E' or 'L', abs or fractional)."""
+    if quantity == "E":
+        t, y = reduce_energy(path, n_bins, fractional)
+        ylabel, title = ("ΔE/|E0|", "Energy (fractional)") if fractional else ("Total Energy", "Energy (absolute)")
+    else:
+        t, y = reduce_L(path, n_bins, fractional)
+        ylabel, title = (("Δ|L|/|L0|", "Angular Momentum (fractional)") if fractional
+                         else ("|L|", "Angular Momentum (absolute)"))
+    fig, ax = plt.subplots()
+    if fractional:
+        ax.plot(t, y)
+        ax.axhline(0, lw=0.8, color="k")
+    else:
+        ax.plot(t, y)
+    ax.set(xlabel="Time [yr]", ylabel=ylabel, title=title)
+    ax.grid(True)
+    return fig
+
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--outdir", type=Path, default=DEFAULT_OUTDIR)
+    ap.add_argument("--jobs", type=int, default=None, help="parallel render workers")
+    ap.add_argument("--bins", type=int, default=DEFAULT_BINS, help="x bins per series")
     ap.add_argument("--show", action="store_true")
     args = ap.parse_args()
     outdir: Path = args.outdir
     outdir.mkdir(parents=True, exist_ok=True)
 
-    energy_df = _load_table(outdir, "energy")
-    angmom_df = _load_table(outdir, "angmom")
-    tE, E = _extract_energy(energy_df)
-    tL, L = _extract_L(angmom_df)
-
-    figs = []
-
-    # Absolute Energy
-    f1, a1 = plt.subplots()
-    a1.plot(tE, E); a1.set(xlabel="Time [yr]", ylabel="Total Energy", title="Energy (absolute)"); a1.grid(True)
-    f1.savefig(outdir / "energy_abs.png", dpi=200, bbox_inches="tight"); figs.append(f1)
-
-    # Fractional Energy
-    E0 = E[0]; fracE = (E - E0) / (abs(E0) if E0 != 0 else 1.0)
-    f2, a2 = plt.subplots()
-    a2.plot(tE, fracE); a2.axhline(0, lw=0.8, color="k")
-    a2.set(xlabel="Time [yr]", ylabel="ΔE/|E0|", title="Energy (fractional)"); a2.grid(True)
-    f2.savefig(outdir / "energy_frac.png", dpi=200, bbox_inches="tight"); figs.append(f2)
-
-    # Absolute |L|
-    f3, a3 = plt.subplots()
-    a3.plot(tL, L); a3.set(xlabel="Time [yr]", ylabel="|L|", title="Angular Momentum (absolute)"); a3.grid(True)
-    f3.savefig(outdir / "L_abs.png", dpi=200, bbox_inches="tight"); figs.append(f3)
-
-    # Fractional |L|
-    L0 = L[0]; fracL = (L - L0) / (abs(L0) if L0 != 0 else 1.0)
-    f4, a4 = plt.subplots()
-    a4.plot(tL, fracL); a4.axhline(0, lw=0.8, color="k")
-    a4.set(xlabel="Time [yr]", ylabel="Δ|L|/|L0|", title="Angular Momentum (fractional)"); a4.grid(True)
-    f4.savefig(outdir / "L_frac.png", dpi=200, bbox_inches="tight"); figs.append(f4)
+    energy_path = find_table(outdir, "energy")
+    angmom_path = find_table(outdir, "angmom")
+    tasks = [
+        (plot_series, (energy_path, "E", False, args.bins), outdir / "energy_abs.png"),
+        (plot_series, (energy_path, "E", True, args.bins), outdir / "energy_frac.png"),
+        (plot_series, (angmom_path, "L", False, args.bins), outdir / "L_abs.png"),
+        (plot_series, (angmom_path, "L", True, args.bins), outdir / "L_frac.png"),
+    ]
 
     if args.show:
+        for fn, fargs, out_path in tasks:
+            fn(*fargs).savefig(out_path, dpi=200, bbox_inches="tight")
         plt.show()
-    else:
-        for f in figs: plt.close(f)
+        return
+    for saved in render_parallel(tasks, jobs=args.jobs):
+        log.info("Saved %s", saved)
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
@@ -1,59 +1,81 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+from __future__ import annotations
+import argparse
+import logging
 from pathlib import Path
+import matplotlib.pyplot as plt
 
-OUTDIR = Path("outputs/smoke")
-EL_PQT = OUTDIR / "elements.parquet"
-EL_CSV = OUTDIR / "elements.csv"
-
-def load_elements():
-    if EL_PQT.exists(): df = pd.read_parquet(EL_PQT)
-    elif EL_CSV.exists(): df = pd.read_csv(EL_CSV)
-    else: raise FileNotFoundError(f"No elements.[parquet/csv] in {OUTDIR}")
-
-    # unify time column
-    if "time" not in df.columns and "t" in df.columns:
-        df = df.rename(columns={"t": "time"})
-
-    # find a name/id column or create one
-    name_col = next((c for c in ("name","label","body","id","idx","particle") if c in df.columns), None)
-    if name_col is None:
-        # make a stable synthetic id based on row order within each time
-        df = df.sort_values(["time"]).copy()
-        df["body_idx"] = df.groupby("time").cumcount()
-        name_col = "body_idx"
-
-    return df, name_col
-
-def plot_elem(df, name_col, col, ylabel, fname, a_cap=None):
-    plt.figure(figsize=(9,4))
-    for key, grp in df.groupby(name_col):
-        plt.plot(grp["time"], grp[col], lw=1, alpha=0.9, label=str(key))
-    plt.xlabel("Time [yr]"); plt.ylabel(ylabel); plt.title(f"{col}")
-    plt.grid(True)
-    if df[name_col].nunique() <= 12: plt.legend(ncol=2, fontsize=8)
-    if a_cap is not None and col == "a":
-        plt.ylim(0, a_cap)
-    plt.tight_layout()
-    plt.savefig(OUTDIR / fname, dpi=200, bbox_inches="tight")
+from .decimate import DEFAULT_BINS, GroupedReducer
+from .streaming import column_range, find_table, iter_chunks, render_parallel, table_columns
 
-def main():
-    df, name_col = load_elements()
-    keep = ["time"] + [c for c in ("a","e","i") if c in df.columns]
-    df = df[[name_col, *keep]].copy()
+log = logging.getLogger("solar_flyby_sim.plots.quicklook")
+
+DEFAULT_OUTDIR = Path("outputs/smoke")
+NAME_COLUMNS = ("name", "label", "body", "id", "idx", "particle", "index")
+A_CAP_AU = 50.0  # inner-system view when a super-distant body is present
+
+
+def _time_and_name(columns: list[str]) -> tuple[str, str | None]:
+    time_col = "time" if "time" in columns else "t"
+    name_col = next((c for c in NAME_COLUMNS if c in columns), None)
+    return time_col, name_col
 
-    # If there is a super-distant body, keep a separate view for inner system
-    a_cap = None
-    if "a" in df.columns and df["a"].max() > 50:
-        a_cap = 50  # AU
 
-    if "a" in df.columns: plot_elem(df, name_col, "a", "a [AU]", "quick_a.png", a_cap=a_cap)
-    if "e" in df.columns: plot_elem(df, name_col, "e", "e", "quick_e.png")
-    if "i" in df.columns: plot_elem(df, name_col, "i", "i [rad or deg]", "quick_i.png")
+def reduce_element(path: Path, col: str, n_bins: int = DEFAULT_BINS) -> dict:
+    """Stream one element column and return decimated (t, y) per body."""
+    time_col, name_col = _time_and_name(table_columns(path))
+    cols = [time_col, col] + ([name_col] if name_col else [])
+    red = GroupedReducer(column_range(path, time_col), n_bins)
+    last_t, carry = None, None
+    for chunk in iter_chunks(path, cols):
+        if name_col is None:
+            # stable synthetic id based on row order within each time
+            keys = chunk.groupby(time_col, sort=False).cumcount().to_numpy()
+            if last_t is not None and len(chunk) and chunk[time_col].iat[0] == last_t:
+                head = (chunk[time_col] == last_t).to_numpy()
+                keys[head] += carry
+            if len(chunk):
+                last_t = chunk[time_col].iat[-1]
+                carry = int(keys[-1]) + 1
+        else:
+            keys = chunk[name_col].to_numpy()
+        red.update(keys, chunk[time_col].to_numpy(), chunk[col].to_numpy())
+    return red.results()
+
+
+def plot_elem(path: Path, col: str, ylabel: str, n_bins: int = DEFAULT_BINS):
+    series = reduce_element(path, col, n_bins)
+    fig, ax = plt.subplots(figsize=(9, 4))
+    for key, (t, y) in series.items():
+        ax.plot(t, y, lw=1, alpha=0.9, label=str(key))
+    ax.set(xlabel="Time [yr]", ylabel=ylabel, title=col)
+    ax.grid(True)
+    if len(series) <= 12:
+        ax.legend(ncol=2, fontsize=8)
+    if col == "a":
+        a_max = max((y.max() for _, y in series.values() if y.size), default=0.0)
+        if a_max > A_CAP_AU:
+            ax.set_ylim(0, A_CAP_AU)
+    fig.tight_layout()
+    return fig
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--outdir", type=Path, default=DEFAULT_OUTDIR)
+    ap.add_argument("--jobs", type=int, default=None, help="parallel render workers")
+    ap.add_argument("--bins", type=int, default=DEFAULT_BINS, help="x bins per series")
+    args = ap.parse_args()
+    outdir: Path = args.outdir
+
+    path = find_table(outdir, "elements")
+    cols = table_columns(path)
+    specs = [("a", "a [AU]", "quick_a.png"), ("e", "e", "quick_e.png"), ("i", "i [rad]", "quick_i.png")]
+    tasks = [(plot_elem, (path, col, ylabel, args.bins), outdir / fname)
+             for col, ylabel, fname in specs if col in cols]
+    for saved in render_parallel(tasks, jobs=args.jobs):
+        log.info("Saved %s", saved)
 
-    plt.show()
 
 if __name__ == "__main__":
-    print(f"RUNNING: {__file__}")
+    logging.basicConfig(level=logging.INFO)
     main()
-    print(f"Saved quick plots in {OUTDIR}")
@@ -0,0 +1,96 @@
+"""Out-of-core table access and parallel figure rendering for plot scripts.
+
+Tables are read column-selectively: Parquet one row group at a time, CSV in
+fixed-size row chunks. Figures are rendered in worker processes so several
+PNGs are produced concurrently.
+"""
+from __future__ import annotations
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("solar_flyby_sim.plots")
+
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def find_table(outdir: Path, stem: str) -> Path:
+    """Return ``<stem>.parquet`` or ``<stem>.csv`` in ``outdir``."""
+    pqt, csv = Path(outdir) / f"{stem}.parquet", Path(outdir) / f"{stem}.csv"
+    if pqt.exists():
+        return pqt
+    if csv.exists():
+        return csv
+    raise FileNotFoundError(f"Missing {stem}.parquet/csv in {outdir}")
+
+
+def table_columns(path: Path) -> list[str]:
+    """Column names of a table without reading its data."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def column_range(path: Path, column: str) -> tuple[float, float]:
+    """(min, max) of a numeric column: Parquet row-group statistics, else one column-only pass."""
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        meta = pq.ParquetFile(path).metadata
+        k = meta.schema.names.index(column)
+        stats = [meta.row_group(g).column(k).statistics for g in range(meta.num_row_groups)]
+        if stats and all(s is not None and s.has_min_max for s in stats):
+            return float(min(s.min for s in stats)), float(max(s.max for s in stats))
+    lo, hi = np.inf, -np.inf
+    for chunk in iter_chunks(path, [column]):
+        x = chunk[column].to_numpy(dtype=float)
+        x = x[np.isfinite(x)]
+        if x.size:
+            lo, hi = min(lo, float(x.min())), max(hi, float(x.max()))
+    return (lo, hi) if lo <= hi else (0.0, 0.0)
+
+
+def iter_chunks(path: Path, columns: Sequence[str],
+                chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield ``columns`` of the table in chunks (Parquet row groups / CSV blocks)."""
+    columns = list(columns)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        for k in range(pf.num_row_groups):
+            yield pf.read_row_group(k, columns=columns).to_pandas()
+    else:
+        # round_trip: the default parser can drop the last digits, which hides ~1e-15 drifts
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows, float_precision="round_trip")
+
+
+def _render_and_save(render: Callable, args: tuple, out_path: Path, dpi: int) -> str:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = render(*args)
+    fig.savefig(out_path, dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return str(out_path)
+
+
+def render_parallel(tasks: Sequence[tuple[Callable, tuple, Path]],
+                    jobs: int | None = None, dpi: int = 200) -> list[str]:
+    """Run ``render(*args) -> Figure`` for each task and save it to its path.
+
+    ``render`` must be a module-level function so it can be sent to a worker.
+    ``jobs=1`` renders in-process.
+    """
+    if not tasks:
+        return []
+    jobs = min(len(tasks), jobs or os.cpu_count() or 1)
+    if jobs <= 1:
+        return [_render_and_save(fn, args, path, dpi) for fn, args, path in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        futs = [ex.submit(_render_and_save, fn, args, path, dpi) for fn, args, path in tasks]
+        return [f.result() for f in futs]
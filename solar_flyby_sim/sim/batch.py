@@ -0,0 +1,319 @@
+"""Batched ensembles: many small simulations advanced in lockstep in one process.
+
+For small systems (the smoke Sun+Earth stub, short intruder demos) the Python
+overhead of one process and one ``integrate`` loop per run dominates. A batch
+builds every member in one worker, integrates all of them to each common
+output time in turn, copies their states into one stacked array with
+``serialize_particle_data`` and computes the elements of all members in a
+single vectorized pass per chunk of outputs (``analysis.elements.stacked_elements``).
+
+Members share the base config and differ in seed (``seed_master + k *
+seed_stride``) and in optional per-member overrides, deep-merged into the base.
+The output grid is the union of the members' schedules (``sim.schedule``).
+Live snapshots, sensitivity and SimulationArchive files are single-run features
+and are not produced here.
+
+Outputs in ``io.outdir``:
+    elements.parquet   t, step, member, index, elements (one row group per chunk)
+    members.csv        seed, final N, max |dE/E0|, max |dL/L0|, encounters
+    encounters.csv     per-encounter log with a ``member`` column
+
+Config:
+    batch:
+      enabled: true
+      members: 64
+      seed_stride: 1
+      chunk_outputs: 256
+      overrides:                 # optional, one patch per member
+        - {intruder: {v_inf_kms: 15}}
+        - {intruder: {v_inf_kms: 25}}
+
+Throughput against one process per run:
+    python -m solar_flyby_sim.sim.batch --config solar_flyby_sim/configs/smoke.yaml --members 16 --bench
+"""
+from __future__ import annotations
+import argparse
+import copy
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import yaml
+
+from .driver import build_sim
+from .flyby_injection import FlybyManager, intruder_flyby
+from .schedule import OutputSchedule, merge_schedules
+from .timegrid import TimeGrid
+from ..analysis.diagnostics import Diagnostics
+from ..analysis.elements import stacked_elements
+from ..config import SimConfig
+from ..physics.constants import AU_PER_PC
+from ..physics.stellar_passages import draw_flybys
+
+log = logging.getLogger("solar_flyby_sim.batch")
+
+ELEMENT_COLS = ("a", "e", "i", "Omega", "omega", "M", "n", "P", "varpi", "f")
+
+
+def _merge(base: dict, patch: dict) -> dict:
+    out = copy.deepcopy(base)
+    for key, val in (patch or {}).items():
+        if isinstance(val, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], val)
+        else:
+            out[key] = copy.deepcopy(val)
+    return out
+
+
+def member_configs(cfg: dict) -> list[dict]:
+    """Per-member configs: base seed offset by ``k * seed_stride`` plus overrides."""
+    bcfg = cfg.get("batch", {})
+    overrides = list(bcfg.get("overrides") or [])
+    n = max(int(bcfg.get("members", len(overrides) or 1)), len(overrides))
+    stride = int(bcfg.get("seed_stride", 1))
+    seed0 = int(cfg["run"].get("seed_master", 20250808))
+    out = []
+    for k in range(n):
+        mcfg = _merge(cfg, overrides[k] if k < len(overrides) else {})
+        mcfg.pop("batch", None)
+        mcfg["run"]["seed_master"] = seed0 + k * stride
+        out.append(mcfg)
+    return out
+
+
+@dataclass
+class Member:
+    k: int
+    seed: int
+    sim: object
+    flybys: FlybyManager
+    diag: Diagnostics
+    schedule: OutputSchedule
+
+
+def _capture(sim, m_out: np.ndarray, xv_out: np.ndarray) -> None:
+    """Copy masses and states of the first ``len(m_out)`` particles (stars come last)."""
+    nb = m_out.shape[0]
+    if sim.N == nb:
+        sim.serialize_particle_data(m=m_out, xyzvxvyvz=xv_out.reshape(-1))
+        return
+    m = np.empty(sim.N)
+    xv = np.empty((sim.N, 6))
+    sim.serialize_particle_data(m=m, xyzvxvyvz=xv.reshape(-1))
+    m_out[:] = m[:nb]
+    xv_out[:] = xv[:nb]
+
+
+class BatchRunner:
+    """Build all members, then integrate them in lockstep (see module docstring)."""
+
+    def __init__(self, cfg: dict):
+        run = cfg["run"]
+        self.cfg = cfg
+        duration = float(run["duration_yr"])
+        self.grid = TimeGrid.build(run.get("time_mode", "legacy"), float(run["dt_yr"]), duration)
+        self.dt = self.grid.dt
+        self.steps = self.grid.n_steps(duration)
+        self.chunk = max(1, int(cfg.get("batch", {}).get("chunk_outputs", 256)))
+        diag_cfg = cfg.get("diagnostics", {})
+        self.diag_every = int(diag_cfg.get("every_steps", run.get("output_every_steps", 100)))
+
+        self.members: list[Member] = []
+        for k, mcfg in enumerate(member_configs(cfg)):
+            self.members.append(self._build(k, mcfg))
+        n_bodies = {mb.sim.N for mb in self.members}
+        if len(n_bodies) != 1:
+            raise ValueError(f"Batch members must have the same bodies; got N={sorted(n_bodies)}")
+        self.n_bodies = n_bodies.pop()
+
+    def _build(self, k: int, mcfg: dict) -> Member:
+        run = mcfg["run"]
+        fb_cfg = mcfg.get("flybys", {})
+        seed = int(run["seed_master"])
+        rng = np.random.default_rng(seed)
+        sim = build_sim(mcfg, rng)
+
+        flyby_list = draw_flybys(fb_cfg, float(run["duration_yr"]), rng)
+        flybys = FlybyManager(sim, flyby_list, rng=rng,
+                              r_inject_AU=float(fb_cfg.get("injection_radius_pc", 1.0)) * AU_PER_PC)
+        intr = mcfg.get("intruder", {})
+        if intr.get("enabled", False):
+            fb, r_init = intruder_flyby(intr, sim)
+            flybys.add(fb, r_inject_AU=r_init)
+            flyby_list.append(fb)
+
+        diag_cfg = mcfg.get("diagnostics", {})
+        warn_dE, warn_dL = diag_cfg.get("warn_dE"), diag_cfg.get("warn_dL")
+        diag = Diagnostics(sim, None,
+                           warn_dE=float(warn_dE) if warn_dE is not None else None,
+                           warn_dL=float(warn_dL) if warn_dL is not None else None)
+        sched = OutputSchedule.from_config(run, flyby_list, sim.t, self.dt, self.steps)
+        return Member(k, seed, sim, flybys, diag, sched)
+
+    def run(self, outdir: Path) -> float:
+        """Integrate every member to the end and write the outputs; returns wall seconds."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        outdir = Path(outdir)
+        outdir.mkdir(parents=True, exist_ok=True)
+        M, nb = len(self.members), self.n_bodies
+        t_buf = np.empty((self.chunk, M))   # actual sim.t (differs per member only in free mode)
+        s_buf = np.empty(self.chunk, dtype=np.int64)
+        m_buf = np.empty((self.chunk, M, nb))
+        xv_buf = np.empty((self.chunk, M, nb, 6))
+        G = self.members[0].sim.G
+        writer = None
+        k = 0
+
+        def flush(n: int) -> None:
+            nonlocal writer
+            if n == 0:
+                return
+            el = stacked_elements(m_buf[:n], xv_buf[:n], G)
+            shape = el["a"].shape  # (n, M, nb - 1)
+            cols = {
+                "t": np.broadcast_to(t_buf[:n, :, None], shape).ravel(),
+                "step": np.broadcast_to(s_buf[:n, None, None], shape).ravel(),
+                "member": np.broadcast_to(np.arange(M)[None, :, None], shape).ravel(),
+                "index": np.broadcast_to(el["index"][None, None, :], shape).ravel(),
+            }
+            cols.update({c: el[c].ravel() for c in ELEMENT_COLS})
+            table = pa.table(cols)
+            if writer is None:
+                writer = pq.ParquetWriter(outdir / "elements.parquet", table.schema)
+            writer.write_table(table)
+
+        # Every member records whenever any member is due, so outputs stack
+        out_steps = (i for i, _ in merge_schedules(*(mb.schedule for mb in self.members)))
+        diag_sched = OutputSchedule(self.steps, self.diag_every)
+        log.info("Batch: %d members x %d bodies, steps=%d", M, nb, self.steps)
+
+        wall0 = time.perf_counter()
+        try:
+            for i, (is_out, is_diag) in merge_schedules(out_steps, diag_sched):
+                for j, mb in enumerate(self.members):
+                    self.grid.advance(mb.sim, i)
+                    if mb.flybys.update():
+                        mb.diag.rebase()
+                    if is_diag:
+                        mb.diag.update()
+                    if is_out:
+                        _capture(mb.sim, m_buf[k, j], xv_buf[k, j])
+                        t_buf[k, j] = mb.sim.t
+                if is_out:
+                    s_buf[k] = i
+                    k += 1
+                    if k == self.chunk:
+                        flush(k)
+                        k = 0
+            flush(k)
+        finally:
+            if writer is not None:
+                writer.close()
+        wall = time.perf_counter() - wall0
+
+        rows, encounters = [], []
+        for mb in self.members:
+            mb.flybys.close()
+            rows.append({"member": mb.k, "seed": mb.seed, "N_final": mb.sim.N,
+                         "max_dE": mb.diag.max_dE, "max_dL": mb.diag.max_dL,
+                         "n_encounters": len(mb.flybys.encounters), "steps_done": mb.sim.steps_done})
+            encounters += [{"member": mb.k, **asdict(e)} for e in mb.flybys.encounters]
+        pd.DataFrame(rows).to_csv(outdir / "members.csv", index=False)
+        if encounters:
+            pd.DataFrame(encounters).to_csv(outdir / "encounters.csv", index=False)
+        log.info("Batch complete: %d members in %.3f s (%.2f members/s). Output in %s",
+                 M, wall, M / wall if wall > 0 else float("inf"), outdir)
+        return wall
+
+
+def run_batch(cfg: dict | SimConfig) -> float:
+    """Entry point used by ``run.py`` when ``batch.enabled`` is set.
+
+    The base config and every member config are validated before any member is built.
+    """
+    if not isinstance(cfg, SimConfig):
+        cfg = SimConfig.from_dict(cfg)
+    raw = cfg.to_dict()
+    for mcfg in member_configs(raw):
+        SimConfig.from_dict(mcfg)
+    runner = BatchRunner(raw)
+    return runner.run(Path(cfg.io.outdir))
+
+
+# ------------------------------
+# Throughput benchmark
+# ------------------------------
+
+def benchmark(cfg: dict, members: int, workdir: Path) -> dict:
+    """Members per second: one batch process vs one ``run.py`` process per member.
+
+    Both timings include building the simulations; the per-process timing also
+    includes interpreter start-up and imports, which is the overhead batching
+    removes.
+    """
+    workdir = Path(workdir)
+    cfg = _merge(cfg, {"batch": {"members": members}})
+    cfg["batch"].pop("overrides", None)
+
+    t = time.perf_counter()
+    runner = BatchRunner(_merge(cfg, {"io": {"outdir": str(workdir / "batch")}}))
+    runner.run(workdir / "batch")
+    t_batch = time.perf_counter() - t
+
+    run_py = Path(__file__).resolve().parents[2] / "run.py"
+    t = time.perf_counter()
+    for k, mcfg in enumerate(member_configs(cfg)):
+        mcfg["io"] = {"outdir": str(workdir / f"single_{k:03d}")}
+        mcfg["logging"] = {"level": "WARNING"}
+        path = workdir / f"member_{k:03d}.yaml"
+        path.write_text(yaml.safe_dump(mcfg))
+        subprocess.run([sys.executable, str(run_py), "--config", str(path)],
+                       check=True, cwd=run_py.parent, stdout=subprocess.DEVNULL)
+    t_single = time.perf_counter() - t
+
+    res = {
+        "members": members,
+        "batch_s": t_batch,
+        "single_s": t_single,
+        "batch_members_per_s": members / t_batch,
+        "single_members_per_s": members / t_single,
+        "speedup": t_single / t_batch,
+    }
+    log.info("Batch: %.2f members/s (%.2f s); one process per run: %.2f members/s (%.2f s); speedup x%.1f",
+             res["batch_members_per_s"], t_batch, res["single_members_per_s"], t_single, res["speedup"])
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a config as a batch of ensemble members")
+    ap.add_argument("--config", required=True, help="Path to YAML config")
+    ap.add_argument("--members", type=int, default=None, help="override batch.members")
+    ap.add_argument("--outdir", default=None, help="override io.outdir")
+    ap.add_argument("--bench", action="store_true",
+                    help="compare throughput against one process per member (outputs in a temp dir)")
+    args = ap.parse_args()
+
+    with open(args.config, "r") as f:
+        cfg = yaml.safe_load(f)
+    if args.members is not None:
+        cfg = _merge(cfg, {"batch": {"members": args.members}})
+    if args.outdir is not None:
+        cfg = _merge(cfg, {"io": {"outdir": args.outdir}})
+
+    if args.bench:
+        with tempfile.TemporaryDirectory(prefix="sfs_bench_") as tmp:
+            benchmark(cfg, int(cfg.get("batch", {}).get("members", 16)), Path(tmp))
+    else:
+        run_batch(cfg)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -2,33 +2,73 @@
 from __future__ import annotations
 
 import logging
+import os
 from pathlib import Path
+from typing import Iterable
 import numpy as np
 import pandas as pd
 import rebound  # needed for SimulationArchive
 
-from .integrator import make_sim
+from .integrator import force_specs, load_plugins, make_sim
+from .schedule import OutputSchedule, merge_schedules
+from .timegrid import TimeGrid
+from .flyby_injection import FlybyManager, intruder_flyby
+from .sensitivity import Sensitivity
 from ..physics.initial_conditions import get_initial_states
 from ..physics.stellar_passages import draw_flybys
 from ..analysis.elements import compute_elements
 from ..analysis.diagnostics import Diagnostics
 from ..io.storage import OutputWriter
+from ..io.live import SnapshotRing
 from ..utils import set_all_seeds
-from ..physics.constants import R_SUN_AU, J2_SUN_DEFAULT
+from ..config import RunPlan, SimConfig, plan_run
+from ..physics.constants import AU_PER_PC
 
 log = logging.getLogger("solar_flyby_sim.driver")
 
 
-def run_simulation(cfg: dict) -> None:
+def build_sim(cfg: dict, rng: np.random.Generator, skip_forces: Iterable[str] = ()):
+    """IAS15 simulation with forces from ``physics`` and bodies from ``bodies``.
+
+    ``skip_forces`` names plugins to leave out (used by ``config.calibrate``).
+    """
+    run = cfg["run"]
+    phys = cfg["physics"]
+    load_plugins(phys.get("plugins") or [])
+    specs = [s for s in force_specs(phys) if s["name"] not in set(skip_forces)]
+    sim = make_sim(dt_yr=float(run["dt_yr"]), forces=specs)
+
+    # Initial bodies
+    bodies = dict(cfg.get("bodies", {}))
+    if run.get("smoke_stub", False):
+        bodies["smoke_stub"] = True
+    states = get_initial_states(bodies, rng)
+    for bs in states:
+        sim.add(m=bs.m, x=bs.r[0], y=bs.r[1], z=bs.r[2],
+                vx=bs.v[0], vy=bs.v[1], vz=bs.v[2])
+    sim.move_to_com()
+
+    # Per-particle force parameters (J2, mass-loss timescale) need the bodies
+    sim.contents["forces"].bind()
+    return sim
+
+
+def run_simulation(cfg: dict | SimConfig, plan: RunPlan | None = None) -> None:
     """
     Main entry point to build a REBOUND simulation, integrate it, and write outputs.
 
-    Config structure (minimal):
+    ``cfg`` is validated into a ``SimConfig`` and planned (``config.plan_run``)
+    before anything is built, so bad keys, paths or footprints fail here.
+
+    Config structure (minimal; see ``solar_flyby_sim.config`` for all keys and defaults):
       run:
         label: str
         duration_yr: float
         dt_yr: float                 # output sampling interval (IAS15 is adaptive)
         output_every_steps: int
+        densify_near_flyby: bool     # denser outputs around flybys (see sim.schedule)
+        densify: {quiet_every_steps: int, levels: [{k: float, every_steps: int}, ...]}
+        time_mode: legacy|grid|free  # output time base and exact_finish_time (see sim.timegrid)
         seed_master: int (optional)
       physics:
         gr: bool
@@ -36,71 +76,46 @@ def run_simulation(cfg: dict) -> None:
         j2_value: float (optional)
       bodies: {...}            # passed to get_initial_states(...)
       flybys: {...}            # config for draw_flybys(...)
-      intruder:                # optional quick, linear intruder
+      intruder:                # optional single star, injected as a hyperbolic flyby
         enabled: bool
         mass_Msun: float
         v_inf_kms: float
         impact_param_AU: float
         r_init_AU: float
         direction_spherical_deg: [theta_deg, phi_deg]
+      diagnostics:             # optional; E/L conservation sampling
+        every_steps: int       # default: run.output_every_steps
+        warn_dE: float         # warn when max |dE/E0| crosses this (then per decade)
+        warn_dL: float
+      live:                    # optional shared-memory ring for `python -m solar_flyby_sim.io.live`
+        enabled: bool
+        name: str              # default: sfs_<run.label>_<pid>
+        slots: int             # snapshots kept (default 64)
+        max_particles: int     # default 64
+      sensitivity:             # optional variational d(elements)/d(param) + MEGNO
+        enabled: bool
+        megno: bool
+        params: [{flyby: int, param: m|v_inf|b_pc} | {body: int, param: a|e|inc|...}, ...]
       io:
         outdir: str
     """
-    run = cfg["run"]
-    phys = cfg["physics"]
-    fb_cfg = cfg.get("flybys", {})
-    io_cfg = cfg["io"]
+    if not isinstance(cfg, SimConfig):
+        cfg = SimConfig.from_dict(cfg)
+    if plan is None:
+        plan = plan_run(cfg)
+    log.info("%s", plan.summary())
+    run = cfg.run
 
     # Seeds
-    seed_master = int(run.get("seed_master", 20250808))
+    seed_master = run.seed_master
     set_all_seeds(seed_master)
     rng = np.random.default_rng(seed_master)
 
     # Build simulation
-    sim = make_sim(
-        dt_yr=float(run["dt_yr"]),
-        gr=bool(phys.get("gr", True)),
-        j2_on=bool(phys.get("solar_j2", True)),
-        j2_value=float(phys.get("j2_value", J2_SUN_DEFAULT)),
-    )
-    sim.contents["j2_value"] = float(phys.get("j2_value", J2_SUN_DEFAULT))
-
-    # Initial bodies
-    states = get_initial_states(cfg.get("bodies", {}), rng)
-    for bs in states:
-        sim.add(m=bs.m, x=bs.r[0], y=bs.r[1], z=bs.r[2],
-                vx=bs.v[0], vy=bs.v[1], vz=bs.v[2])
-    sim.move_to_com()
-
-    # If oblateness active and available, set parameters on central body
-    rx = sim.contents.get("reboundx")
-    obl = sim.contents.get("obl")
-    if rx is not None and obl is not None:
-        try:
-            j2 = sim.contents.get("j2_value", J2_SUN_DEFAULT)
-            rebx_particle = rx.get_particle(sim.particles[0])
-            rebx_particle.params["J2"] = j2
-            rebx_particle.params["R_eq"] = R_SUN_AU
-            log.info("J2 enabled: J2=%.3e, R_eq=%.6f AU", j2, R_SUN_AU)
-        except Exception as e:
-            log.warning("Failed to set J2 params; continuing without J2. (%s)", e)
-
-    # Optional: add a simple linear stellar intruder
-    intr = cfg.get("intruder", {})
-    if intr.get("enabled", False):
-        from solar_flyby_sim.intruders.quick import add_linear_intruder
-
-        add_linear_intruder(
-            sim,
-            mass_Msun=float(intr.get("mass_Msun", 0.5)),
-            v_inf_kms=float(intr.get("v_inf_kms", 20.0)),
-            impact_param_AU=float(intr.get("impact_param_AU", 1.0e4)),
-            r_init_AU=float(intr.get("r_init_AU", 2.0e4)),
-            direction_spherical_deg=tuple(intr.get("direction_spherical_deg", [60.0, 40.0])),
-        )
+    sim = build_sim(cfg.to_dict(), rng)
 
     # Outputs
-    outdir = Path(io_cfg.get("outdir", "outputs/run"))
+    outdir = Path(cfg.io.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
     writer = OutputWriter(outdir)
 
@@ -117,36 +132,83 @@ def run_simulation(cfg: dict) -> None:
     snapshot(sim)
 
 
-    # Time stepping (integrate to a regular grid for outputs)
-    duration = float(run["duration_yr"])
-    dt = float(run["dt_yr"])
-    steps = int(np.floor(duration / dt))
-    every = int(run.get("output_every_steps", 100))
-
-    # Diagnostics
-    diag = Diagnostics(sim)
-
-    # (Placeholder) stochastic flybys list if you use that pipeline
-    flyby_list = draw_flybys(fb_cfg, duration, rng)
-    next_flyby_idx = 0  # reserved if you later trigger them during the loop
-
-    log.info("Starting integration: duration=%.3e yr, steps=%d", duration, steps)
-    t0 = sim.t
-
-    for i in range(steps + 1):
-        # If you later want to trigger scheduled flybys, check here using sim.t
-        # while next_flyby_idx < len(flyby_list) and flyby_list[next_flyby_idx].t <= sim.t:
-        #     flyby_list[next_flyby_idx].apply(sim)
-        #     next_flyby_idx += 1
-
-        sim.integrate(t0 + i * dt)
-
-        if i % every == 0:
-            elems = pd.DataFrame(compute_elements(sim))
-            energy = diag.energy()
-            angmom = diag.angular_momentum()
-            writer.write_snapshot(sim.t, elems, energy, angmom)
-            snapshot(sim)
-
+    # Time stepping (outputs on a regular grid, densified near flybys; see sim.timegrid)
+    duration = run.duration_yr
+    grid = TimeGrid.build(run.time_mode, run.dt_yr, duration, t0=sim.t)
+    dt = grid.dt
+    steps = grid.n_steps(duration)
+    log.info("Time grid: %s", grid.describe())
+
+    # Diagnostics (own cadence; writes energy.csv / angmom.csv)
+    diag = Diagnostics(sim, outdir, warn_dE=cfg.diagnostics.warn_dE, warn_dL=cfg.diagnostics.warn_dL)
+
+    # Flyby stars: injected at the injection radius, removed again on exit
+    n_bodies = sim.N
+    flyby_list = draw_flybys(cfg.flybys.to_dict(), duration, rng)
+    flybys = FlybyManager(sim, flyby_list, rng=rng,
+                          r_inject_AU=cfg.flybys.injection_radius_pc * AU_PER_PC,
+                          remove_on_exit=not cfg.sensitivity.enabled)
+    if cfg.intruder.enabled:
+        fb, r_init = intruder_flyby(cfg.intruder.to_dict(), sim)
+        flybys.add(fb, r_inject_AU=r_init)
+        flyby_list.append(fb)
+
+    # Variational sensitivities: stars due at t0 must be in before variations are added
+    sens = None
+    if cfg.sensitivity.enabled:
+        flybys.update()
+        sens = Sensitivity.from_config(sim, cfg.sensitivity.to_dict(), flybys, n_bodies)
+
+    # Live monitoring ring (shared memory; no file I/O on publish)
+    live = cfg.live
+    ring = None
+    if live.enabled:
+        ring = SnapshotRing(live.name or f"sfs_{run.label}_{os.getpid()}",
+                            slots=live.slots, max_particles=live.max_particles)
+        log.info("Live snapshots in shared memory %r (python -m solar_flyby_sim.io.live %s)",
+                 ring.name, ring.name)
+
+    # Output/diagnostic step schedules on the time grid
+    t0 = grid.t0
+    out_sched = OutputSchedule.from_config(run.to_dict(), flyby_list, t0, dt, steps)
+    diag_sched = OutputSchedule(steps, cfg.diag_every)
+
+    log.info("Starting integration: duration=%.3e yr, steps=%d, outputs<=%d (%d dense windows)",
+             duration, steps, out_sched.estimate_count(), len(out_sched.windows))
+
+    n_clock_fix = 0
+    try:
+        for i, (is_out, is_diag) in merge_schedules(out_sched, diag_sched):
+            t_i = grid.advance(sim, i)
+            if grid.mode == "grid" and sim.t != t_i:
+                sim.t = t_i  # keep stored times exactly on the grid
+                n_clock_fix += 1
+
+            if flybys.update():
+                diag.rebase()  # E and L jump when a star enters or leaves
+
+            if is_diag:
+                diag.update()
+
+            if is_out:
+                elems = pd.DataFrame(compute_elements(sim, n_bodies=n_bodies))
+                writer.write_snapshot(sim.t, elems, step=i)
+                if sens is not None:
+                    sens.sample()
+                if ring is not None:
+                    ring.publish(sim, elems, diag)
+                snapshot(sim)
+    finally:
+        if ring is not None:
+            ring.close()
+
+    if n_clock_fix:
+        log.warning("Snapped sim.t onto the time grid %d times", n_clock_fix)
+    for name, t in sim.contents["forces"].timing().items():
+        log.info("Force %s: %d calls, %.3f s", name, t["calls"], t["wall_s"])
     writer.finalize()
+    diag.close()
+    flybys.finalize(outdir)
+    if sens is not None:
+        sens.finalize(outdir)
     log.info("Run complete. Output in %s", outdir)
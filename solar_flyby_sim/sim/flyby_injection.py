@@ -1,4 +1,307 @@
-"""Placeholder for Step 5: create temporary REBOUND particles for flybys.
-- Spawn at 1 pc, integrate through, log min approaches, remove on exit.
-- Manage dt shrink/restore, optional switch to IAS15 in encounter window.
-"""
\ No newline at end of file
+"""Step 5: create temporary REBOUND particles for flybys.
+
+Each ``Flyby`` is placed on its two-body hyperbola about the Sun when it
+reaches the injection radius (1 pc by default), tracked by its REBOUND
+hash/name while inside, and removed once it is outbound beyond that radius
+again, so N and the force cost drop back between encounters. Any number of
+encounters may overlap.
+
+``Flyby.t`` is the time of closest approach; ``Flyby.nhat`` is the direction
+of the incoming velocity at infinity. The impact vector ``bhat`` is taken
+from the flyby if set, otherwise drawn uniformly perpendicular to ``nhat``.
+
+Per-encounter results (min approach, timing, integrator steps and wall time
+while the star was present) go to ``encounters.csv``.
+"""
+from __future__ import annotations
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from ..physics.constants import AU_PER_PC
+from ..physics.stellar_passages import Flyby
+
+log = logging.getLogger("solar_flyby_sim.flyby_injection")
+
+AU_PER_KM = 1.0 / 1.495978707e8
+YR_PER_S = 1.0 / (365.25 * 24 * 3600.0)
+
+
+# ------------------------------
+# Hyperbolic two-body geometry
+# ------------------------------
+
+def _hyperbola(mu: float, v_inf: float, b_AU: float) -> tuple[float, float, float]:
+    """(a < 0, e > 1, n) of the relative orbit."""
+    a = -mu / v_inf**2
+    e = math.sqrt(1.0 + (b_AU * v_inf**2 / mu) ** 2)
+    n = math.sqrt(mu / abs(a) ** 3)
+    return a, e, n
+
+
+def _impact_basis(nhat, bhat=None, rng: np.random.Generator | None = None):
+    nhat = np.asarray(nhat, dtype=float)
+    nhat = nhat / np.linalg.norm(nhat)
+    if bhat is None:
+        rng = rng if rng is not None else np.random.default_rng()
+        ref = np.array([0.0, 0.0, 1.0]) if abs(nhat[2]) < 0.95 else np.array([1.0, 0.0, 0.0])
+        u = np.cross(nhat, ref)
+        u /= np.linalg.norm(u)
+        w = np.cross(nhat, u)
+        phi = rng.uniform(0.0, 2.0 * math.pi)
+        bhat = math.cos(phi) * u + math.sin(phi) * w
+    else:
+        bhat = np.asarray(bhat, dtype=float)
+        bhat = bhat - np.dot(bhat, nhat) * nhat
+        bhat /= np.linalg.norm(bhat)
+    return nhat, bhat
+
+
+def time_from_periapsis(mu: float, v_inf: float, b_AU: float, r_AU: float) -> float:
+    """Time [yr] to travel between radius ``r_AU`` and periapsis."""
+    a, e, n = _hyperbola(mu, v_inf, b_AU)
+    coshH = max((1.0 - r_AU / a) / e, 1.0)
+    H = math.acosh(coshH)
+    return (e * math.sinh(H) - H) / n
+
+
+def hyperbolic_state(mu: float, v_inf: float, b_AU: float, nhat, bhat, dt_peri: float):
+    """Relative (r, v) at ``dt_peri`` years from periapsis (negative = inbound)."""
+    a, e, n = _hyperbola(mu, v_inf, b_AU)
+    M = n * dt_peri
+    # Solve e sinh H - H = M (Newton)
+    H = math.asinh(M / e)
+    for _ in range(100):
+        f = e * math.sinh(H) - H - M
+        dH = -f / (e * math.cosh(H) - 1.0)
+        H += dH
+        if abs(dH) < 1e-14 * max(1.0, abs(H)):
+            break
+    s = math.sqrt(e * e - 1.0)
+    # Perifocal axes from the asymptote: nhat = (P + s Q) / e
+    P = (nhat + s * bhat) / e
+    Q = (s * nhat - bhat) / e
+    x = a * (math.cosh(H) - e)
+    y = -a * s * math.sinh(H)
+    r = a * (1.0 - e * math.cosh(H))
+    vfac = math.sqrt(mu * abs(a)) / r
+    vx = -vfac * math.sinh(H)
+    vy = vfac * s * math.cosh(H)
+    return x * P + y * Q, vx * P + vy * Q
+
+
+# ------------------------------
+# Manager
+# ------------------------------
+
+@dataclass
+class Encounter:
+    id: int
+    hash: str
+    m: float
+    v_inf: float           # AU/yr
+    b_pc: float
+    t_peri_planned: float  # yr
+    t_inject: float = math.nan
+    t_remove: float = math.nan
+    r_inject_AU: float = math.nan
+    q_min_AU: float = math.inf   # closest approach to the Sun
+    t_min: float = math.nan
+    steps: int = 0               # integrator steps while present
+    wall_s: float = 0.0          # wall time while present
+    removed: bool = False
+
+
+class FlybyManager:
+    """Inject, track and remove flyby stars during the main loop.
+
+    Call ``update()`` after every ``sim.integrate`` in the driver loop.
+    """
+
+    def __init__(self, sim, flybys=(), r_inject_AU: float = AU_PER_PC,
+                 rng: np.random.Generator | None = None, central_index: int = 0,
+                 remove_on_exit: bool = True):
+        self.sim = sim
+        self.r_inject_AU = float(r_inject_AU)
+        self.remove_on_exit = remove_on_exit
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.central_index = central_index
+        self.encounters: list[Encounter] = []
+        self._pending: list[tuple[float, Encounter, Flyby]] = []   # sorted by t_inject
+        self._active: dict[str, dict] = {}
+        for fb in flybys:
+            self.add(fb)
+
+    @property
+    def n_active(self) -> int:
+        return len(self._active)
+
+    @property
+    def n_pending(self) -> int:
+        return len(self._pending)
+
+    def active_star(self, encounter_id: int) -> tuple[Flyby, np.ndarray, np.ndarray]:
+        """(flyby, nhat, bhat) of an injected star, e.g. to differentiate its state."""
+        state = self._active[self.encounters[encounter_id].hash]
+        return state["fb"], state["nhat"], state["bhat"]
+
+    def _mu(self, m: float) -> float:
+        return self.sim.G * (self.sim.particles[self.central_index].m + m)
+
+    def add(self, fb: Flyby, r_inject_AU: float | None = None) -> Encounter:
+        """Schedule ``fb``; it enters when it reaches the injection radius."""
+        r_inj = float(r_inject_AU if r_inject_AU is not None else self.r_inject_AU)
+        b_AU = float(fb.b_pc) * AU_PER_PC
+        mu = self._mu(fb.m)
+        _, e, _ = _hyperbola(mu, fb.v_inf, b_AU)
+        q = b_AU * math.sqrt((e - 1.0) / (e + 1.0))
+        if q >= r_inj:
+            raise ValueError(f"Flyby periapsis {q:.3e} AU lies outside the injection radius {r_inj:.3e} AU")
+        enc = Encounter(
+            id=len(self.encounters), hash=f"flyby{len(self.encounters)}",
+            m=float(fb.m), v_inf=float(fb.v_inf), b_pc=float(fb.b_pc),
+            t_peri_planned=float(fb.t), r_inject_AU=r_inj,
+        )
+        enc.t_inject = fb.t - time_from_periapsis(mu, fb.v_inf, b_AU, r_inj)
+        self.encounters.append(enc)
+        self._pending.append((enc.t_inject, enc, fb))
+        self._pending.sort(key=lambda item: item[0])
+        return enc
+
+    def _inject(self, enc: Encounter, fb: Flyby) -> None:
+        sim = self.sim
+        sun = sim.particles[self.central_index]
+        mu = self._mu(fb.m)
+        nhat, bhat = _impact_basis(fb.nhat, getattr(fb, "bhat", None), self.rng)
+        r, v = hyperbolic_state(mu, fb.v_inf, fb.b_pc * AU_PER_PC, nhat, bhat, sim.t - fb.t)
+        _add_tagged(sim, enc.hash, m=fb.m,
+                    x=sun.x + r[0], y=sun.y + r[1], z=sun.z + r[2],
+                    vx=sun.vx + v[0], vy=sun.vy + v[1], vz=sun.vz + v[2])
+        enc.t_inject = sim.t
+        self._active[enc.hash] = {"enc": enc, "fb": fb, "nhat": nhat, "bhat": bhat,
+                                  "steps0": sim.steps_done, "wall0": time.perf_counter(),
+                                  "rdot_prev": float(np.dot(r, v))}
+        log.info("Flyby %d injected at t=%.6g yr (r=%.3e AU, m=%.3g Msun, N=%d)",
+                 enc.id, sim.t, float(np.linalg.norm(r)), fb.m, sim.N)
+
+    def update(self) -> bool:
+        """Inject due stars, update closest approaches, remove stars that left.
+
+        Returns True if a star was injected or removed.
+        """
+        sim = self.sim
+        changed = False
+        while self._pending and self._pending[0][0] <= sim.t:
+            _, enc, fb = self._pending.pop(0)
+            self._inject(enc, fb)
+            changed = True
+        if not self._active:
+            return changed
+
+        sun = sim.particles[self.central_index]
+        for key in list(self._active):
+            state = self._active[key]
+            enc: Encounter = state["enc"]
+            p = sim.particles[key]
+            r = np.array([p.x - sun.x, p.y - sun.y, p.z - sun.z])
+            v = np.array([p.vx - sun.vx, p.vy - sun.vy, p.vz - sun.vz])
+            r_norm = float(np.linalg.norm(r))
+            rdot = float(np.dot(r, v))
+            if r_norm < enc.q_min_AU:
+                enc.q_min_AU, enc.t_min = r_norm, sim.t
+            if state["rdot_prev"] < 0.0 <= rdot:
+                # passed periapsis since the last check: use the osculating hyperbola
+                q, t_q = _osculating_periapsis(r, v, self._mu(p.m), sim.t)
+                if q < enc.q_min_AU:
+                    enc.q_min_AU, enc.t_min = q, t_q
+            state["rdot_prev"] = rdot
+
+            if self.remove_on_exit and rdot > 0.0 and r_norm >= enc.r_inject_AU:
+                enc.steps = sim.steps_done - state["steps0"]
+                enc.wall_s = time.perf_counter() - state["wall0"]
+                enc.t_remove = sim.t
+                enc.removed = True
+                _remove_tagged(sim, key)
+                del self._active[key]
+                log.info("Flyby %d removed at t=%.6g yr (q_min=%.4g AU, N=%d)",
+                         enc.id, sim.t, enc.q_min_AU, sim.N)
+                changed = True
+        return changed
+
+    def close(self) -> None:
+        """Fill in steps and wall time of encounters still in progress."""
+        for state in self._active.values():
+            enc = state["enc"]
+            enc.steps = self.sim.steps_done - state["steps0"]
+            enc.wall_s = time.perf_counter() - state["wall0"]
+
+    def finalize(self, outdir: Path) -> None:
+        """Close open encounters and write ``encounters.csv``."""
+        self.close()
+        if self.encounters:
+            pd.DataFrame([asdict(e) for e in self.encounters]).to_csv(
+                Path(outdir) / "encounters.csv", index=False)
+
+
+def _osculating_periapsis(r, v, mu: float, t: float) -> tuple[float, float]:
+    """Periapsis distance and time of the osculating orbit (unbound or bound)."""
+    r_norm = float(np.linalg.norm(r))
+    h = np.cross(r, v)
+    e_vec = np.cross(v, h) / mu - r / r_norm
+    e = float(np.linalg.norm(e_vec))
+    p = float(np.dot(h, h)) / mu
+    q = p / (1.0 + e)
+    if e > 1.0:
+        a = p / (1.0 - e * e)
+        n = math.sqrt(mu / abs(a) ** 3)
+        coshH = max((1.0 - r_norm / a) / e, 1.0)
+        H = math.copysign(math.acosh(coshH), float(np.dot(r, v)))
+        return q, t - (e * math.sinh(H) - H) / n
+    return q, t
+
+
+def _add_tagged(sim, key: str, **kw) -> None:
+    # REBOUND < 4.4 identifies particles by hash; newer versions by name
+    try:
+        sim.add(hash=key, **kw)
+    except TypeError:
+        sim.add(name=key, **kw)
+
+
+def _remove_tagged(sim, key: str) -> None:
+    try:
+        sim.remove(hash=key)
+    except TypeError:
+        sim.remove(key)
+
+
+# ------------------------------
+# Config helpers
+# ------------------------------
+
+def intruder_flyby(intr: dict, sim, central_index: int = 0) -> tuple[Flyby, float]:
+    """Flyby for the ``intruder`` config block, entering at ``r_init_AU`` now.
+
+    ``direction_spherical_deg`` = (theta, phi) of the approach direction (star
+    toward Sun); the path is offset by ``impact_param_AU``.
+    """
+    theta_deg, phi_deg = intr.get("direction_spherical_deg", [60.0, 40.0])
+    th, ph = math.radians(theta_deg), math.radians(phi_deg)
+    nhat = np.array([math.sin(th) * math.cos(ph), math.sin(th) * math.sin(ph), math.cos(th)])
+    ref = np.array([0.0, 0.0, 1.0]) if abs(nhat[2]) <= 0.95 else np.array([1.0, 0.0, 0.0])
+    bhat = np.cross(nhat, ref)
+    bhat /= np.linalg.norm(bhat)
+
+    m = float(intr.get("mass_Msun", 0.5))
+    v_inf = float(intr.get("v_inf_kms", 20.0)) * AU_PER_KM / YR_PER_S
+    b_AU = float(intr.get("impact_param_AU", 1.0e4))
+    r_init = float(intr.get("r_init_AU", 2.0e4))
+    mu = sim.G * (sim.particles[central_index].m + m)
+    t_peri = sim.t + time_from_periapsis(mu, v_inf, b_AU, r_init)
+    fb = Flyby(t=t_peri, m=m, v_inf=v_inf, b_pc=b_AU / AU_PER_PC, nhat=nhat,
+               impulse_grad=float("nan"), bhat=bhat)
+    return fb, r_init
@@ -1,41 +1,278 @@
-"""REBOUND simulation factory using IAS15 with optional GR/J2 via REBOUNDx."""
+"""REBOUND simulation factory (IAS15) with a registry of force plugins.
+
+Extra physics is attached through named plugins rather than ad-hoc loading.
+A plugin is a function registered with ``@register_force(name)`` that adds
+its effect to a ``ForceSet`` and returns a ``ForceHandle``. There are three
+kinds of effect, all hosted by REBOUNDx so they chain with each other:
+
+- REBOUNDx effects (``gr``, ``j2``, ``solar_mass_loss``): compiled C, loaded by
+  name, with particle parameters set by ``ForceSet.bind`` once the bodies exist.
+- NumPy kernels (``ForceSet.add_kernel``): ``kernel(t, m, x, v, a)`` gets
+  zero-copy (N,)/(N, 3) views of the contiguous particle array and adds to
+  ``a`` in place. There is one Python call per force evaluation and no
+  per-particle loop.
+- Compiled kernels (``compiled`` plugin): a C function from a shared library
+  with the REBOUNDx force signature
+  ``void f(struct reb_simulation*, struct rebx_force*, struct reb_particle*, int N)``.
+  It is called directly from C, without the interpreter.
+
+A requested plugin that cannot be loaded is an error, not a warning. Kernels
+time themselves (``ForceSet.timing``). For C effects, ``config.calibrate``
+measures each force's share of step time by leaving it out.
+
+Config (under ``physics``):
+    gr: true
+    solar_j2: true
+    j2_value: 2.2e-7
+    solar_mass_loss: true
+    solar_mass_loss_rate: 9.1e-14          # Msun/yr
+    plugins: [my_package.my_forces]        # modules that call register_force
+    extra_forces:
+      - {name: my_drag, k: 1.0e-9}
+      - {name: compiled, library: build/libforce.so, symbol: yarkovsky, velocity_dependent: true}
+"""
 from __future__ import annotations
+import ctypes
+import importlib
 import logging
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+import numpy as np
 import rebound
-from ..physics.constants import C_AU_PER_YR, J2_SUN_DEFAULT
+from ..physics.constants import C_AU_PER_YR, J2_SUN_DEFAULT, R_SUN_AU, SOLAR_MDOT_DEFAULT
 
 log = logging.getLogger("solar_flyby_sim.integrator")
 
-def make_sim(dt_yr: float, gr: bool = True, j2_on: bool = True, j2_value: float = J2_SUN_DEFAULT):
+_REGISTRY: dict[str, Callable[..., "ForceHandle"]] = {}
+
+# reb_particle starts with x, y, z, vx, vy, vz, ax, ay, az, m (float64)
+_PARTICLE_SIZE = ctypes.sizeof(rebound.Particle)
+_PARTICLE_FIELDS = ("x", "y", "z", "vx", "vy", "vz", "ax", "ay", "az", "m")
+
+
+def register_force(name: str):
+    """Decorator registering ``fn(forces: ForceSet, **params) -> ForceHandle`` as ``name``."""
+    def deco(fn):
+        _REGISTRY[name] = fn
+        return fn
+    return deco
+
+
+def available_forces() -> list[str]:
+    return sorted(_REGISTRY)
+
+
+def load_plugins(modules: Iterable[str]) -> None:
+    """Import modules that register extra force plugins."""
+    for mod in modules:
+        importlib.import_module(mod)
+
+
+def particle_view(particles, n: int) -> np.ndarray:
+    """(n, 10) float64 view (x y z vx vy vz ax ay az m) of a ``reb_particle`` array."""
+    addr = ctypes.cast(particles, ctypes.c_void_p).value
+    buf = (ctypes.c_char * (n * _PARTICLE_SIZE)).from_address(addr)
+    return np.ndarray((n, len(_PARTICLE_FIELDS)), dtype=np.float64, buffer=buf,
+                      strides=(_PARTICLE_SIZE, 8))
+
+
+@dataclass
+class ForceHandle:
+    name: str
+    kind: str                      # "reboundx" | "operator" | "kernel" | "compiled"
+    obj: object = None             # REBOUNDx Force / Operator
+    bind: Callable | None = None   # called with sim once the bodies are added
+    calls: int = 0                 # kernels only
+    wall_s: float = 0.0
+
+
+class ForceSet:
+    """Plugins attached to one simulation (``sim.contents["forces"]``)."""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.handles: dict[str, ForceHandle] = {}
+        self.quiet: list[str] = []   # benign REBOUNDx warnings (regex) hidden by ``integrate``
+        self._rx = None
+
+    @property
+    def rx(self):
+        """The simulation's REBOUNDx extras, created on first use."""
+        if self._rx is None:
+            try:
+                import reboundx
+            except ImportError as e:
+                raise RuntimeError(f"Force plugins need REBOUNDx ({e})") from e
+            self._rx = reboundx.Extras(self.sim)
+            self.sim.contents["reboundx"] = self._rx
+        return self._rx
+
+    def add(self, name: str, **params) -> ForceHandle:
+        if name not in _REGISTRY:
+            raise KeyError(f"Unknown force plugin {name!r}; registered: {available_forces()}")
+        handle = _REGISTRY[name](self, **params)
+        self.handles[handle.name] = handle
+        return handle
+
+    def add_rebx_force(self, name: str, rebx_name: str) -> ForceHandle:
+        force = self.rx.load_force(rebx_name)
+        self.rx.add_force(force)
+        return ForceHandle(name, "reboundx", force)
+
+    def add_kernel(self, name: str, kernel: Callable, velocity_dependent: bool = False) -> ForceHandle:
+        """Add ``kernel(t, m, x, v, a)`` as a REBOUNDx custom force (accelerations added to ``a``)."""
+        fields = tuple(f[0] for f in rebound.Particle._fields_[:len(_PARTICLE_FIELDS)])
+        if fields != _PARTICLE_FIELDS:
+            raise RuntimeError(f"Unexpected reb_particle layout {fields}; NumPy kernels unavailable")
+        handle = ForceHandle(name, "kernel")
+
+        def update(simp, forcep, particles, n):
+            wall0 = time.perf_counter()
+            p = particle_view(particles, n)
+            kernel(simp.contents.t, p[:, 9], p[:, 0:3], p[:, 3:6], p[:, 6:9])
+            handle.calls += 1
+            handle.wall_s += time.perf_counter() - wall0
+
+        force = self.rx.create_force(name)
+        force.force_type = "vel" if velocity_dependent else "pos"
+        force.update_accelerations = update
+        self.rx.add_force(force)
+        handle.obj = force
+        self.handles[name] = handle
+        return handle
+
+    def add_compiled(self, name: str, library: str, symbol: str,
+                     velocity_dependent: bool = False) -> ForceHandle:
+        """Add a C function with the REBOUNDx force signature from a shared library."""
+        import reboundx.extras as rbx
+
+        path = Path(library)
+        if not path.exists():
+            raise FileNotFoundError(f"Force library not found: {library}")
+        fn = getattr(ctypes.CDLL(str(path.resolve())), symbol)
+        force = self.rx.create_force(name)
+        force.force_type = "vel" if velocity_dependent else "pos"
+        cfn = ctypes.cast(fn, rbx.FORCEFUNCPTR)
+        force._ffp = cfn  # keep the library function alive with the force
+        force._update_accelerations = cfn
+        self.rx.add_force(force)
+        handle = self.handles[name] = ForceHandle(name, "compiled", force)
+        return handle
+
+    def integrate(self, t: float, exact_finish_time: int = 1) -> None:
+        """``sim.integrate`` with the plugins' known-benign warnings silenced for this call only."""
+        if not self.quiet:
+            self.sim.integrate(t, exact_finish_time=exact_finish_time)
+            return
+        with warnings.catch_warnings():
+            for msg in self.quiet:
+                warnings.filterwarnings("ignore", message=msg)
+            self.sim.integrate(t, exact_finish_time=exact_finish_time)
+
+    def bind(self) -> None:
+        """Set per-particle parameters; call after the bodies are added."""
+        for handle in self.handles.values():
+            if handle.bind is not None:
+                handle.bind(self.sim)
+
+    def timing(self) -> dict[str, dict]:
+        """Calls and wall time of self-timed (kernel) forces."""
+        return {h.name: {"calls": h.calls, "wall_s": h.wall_s}
+                for h in self.handles.values() if h.kind == "kernel"}
+
+
+# ------------------------------
+# Built-in plugins
+# ------------------------------
+
+@register_force("gr")
+def _gr(forces: ForceSet, c: float = C_AU_PER_YR) -> ForceHandle:
+    handle = forces.add_rebx_force("gr", "gr")
+    handle.obj.params["c"] = c
+    forces.sim.contents["gr"] = handle.obj
+    return handle
+
+
+@register_force("j2")
+def _j2(forces: ForceSet, J2: float = J2_SUN_DEFAULT, R_eq: float = R_SUN_AU, index: int = 0) -> ForceHandle:
+    handle = forces.add_rebx_force("j2", "gravitational_harmonics")
+    forces.sim.contents["obl"] = handle.obj
+
+    def bind(sim):
+        p = sim.particles[index]
+        p.params["J2"] = J2
+        p.params["R_eq"] = R_eq
+        log.info("J2 enabled: J2=%.3e, R_eq=%.6f AU", J2, R_eq)
+
+    handle.bind = bind
+    return handle
+
+
+@register_force("solar_mass_loss")
+def _solar_mass_loss(forces: ForceSet, rate: float = SOLAR_MDOT_DEFAULT, index: int = 0) -> ForceHandle:
+    """Isotropic mass loss of the central body at ``rate`` Msun/yr (REBOUNDx ``modify_mass``).
+
+    ``modify_mass`` is exponential, m = m0 exp(t / tau); with tau = -m0 / rate
+    the initial rate is exact and the difference from linear loss is
+    O((rate t / m0)^2), ~1e-12 over 2e7 yr.
+    """
+    rx = forces.rx
+    op = rx.load_operator("modify_mass")
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message=".*Do not change the integrator after adding an operator")
+        rx.add_operator(op)
+    # REBOUNDx warns on every integrate() about operators with adaptive steps;
+    # the relative mass change per IAS15 step is ~1e-15, far below its tolerance.
+    forces.quiet.append("REBOUNDx: Operators that affect particle trajectories")
+
+    def bind(sim):
+        p = sim.particles[index]
+        p.params["tau_mass"] = -p.m / rate
+        log.info("Solar mass loss: %.3e Msun/yr (tau=%.3e yr)", rate, -p.m / rate)
+
+    return ForceHandle("solar_mass_loss", "operator", op, bind=bind)
+
+
+@register_force("compiled")
+def _compiled(forces: ForceSet, library: str, symbol: str, name: str | None = None,
+              velocity_dependent: bool = False) -> ForceHandle:
+    return forces.add_compiled(name or symbol, library, symbol, velocity_dependent)
+
+
+# ------------------------------
+# Factory
+# ------------------------------
+
+def force_specs(phys: dict) -> list[dict]:
+    """Plugins requested by a ``physics`` config, in load order: ``[{name, **params}]``."""
+    specs = []
+    if phys.get("gr", True):
+        specs.append({"name": "gr"})
+    if phys.get("solar_j2", True):
+        specs.append({"name": "j2", "J2": float(phys.get("j2_value", J2_SUN_DEFAULT))})
+    if phys.get("solar_mass_loss", False):
+        specs.append({"name": "solar_mass_loss",
+                      "rate": float(phys.get("solar_mass_loss_rate", SOLAR_MDOT_DEFAULT))})
+    specs.extend(dict(s) for s in phys.get("extra_forces") or [])
+    return specs
+
+
+def make_sim(dt_yr: float, forces: Iterable[dict] = ()):
+    """IAS15 simulation with the given force plugins loaded (call ``ForceSet.bind`` after adding bodies)."""
     sim = rebound.Simulation()
     sim.units = ("AU", "yr", "Msun")
     sim.integrator = "ias15"
     sim.dt = dt_yr
 
-    # Only bring in REBOUNDx if we actually need it
     sim.contents = {}
-    if gr or j2_on:
-        try:
-            import reboundx
-            rx = reboundx.Extras(sim)
-            sim.contents["reboundx"] = rx
-            if gr:
-                try:
-                    grmod = rx.load_force("gr")
-                    rx.add_force(grmod)
-                    grmod.params["c"] = C_AU_PER_YR
-                except Exception as e:
-                    log.warning("GR force not available in this REBOUNDx build; continuing without GR. (%s)", e)
-            if j2_on:
-                try:
-                    obl = rx.load_force("gravitational_harmonics")
-                    rx.add_force(obl)
-                    sim.contents["obl"] = obl
-                except Exception as e:
-                    log.warning("Gravitational Harmonics not available; continuing without J2. (%s)", e)
-        except Exception as e:
-            log.warning("REBOUNDx not available; continuing without GR/J2. (%s)", e)
-
-    # store J2 value for later (if available)
-    sim.contents["j2_value"] = j2_value
+    fs = ForceSet(sim)
+    sim.contents["forces"] = fs
+    for spec in forces:
+        spec = dict(spec)
+        fs.add(spec.pop("name"), **spec)
+    if fs.handles:
+        log.info("Forces: %s", ", ".join(f"{h.name} ({h.kind})" for h in fs.handles.values()))
     return sim
@@ -0,0 +1,120 @@
+"""Output time grid: sparse in quiet periods, dense around flyby encounters.
+
+Output times stay on the integration grid ``t0 + i * dt``; a schedule is the
+set of step indices ``i`` at which the driver integrates and writes. Outside
+encounters that is every ``quiet_every_steps``; within ``±k`` encounter-crossing
+times (``b / v_inf``) of each ``Flyby.t`` (closest approach) the cadence of the
+matching level applies. Steps inside a window are aligned to multiples of the
+window cadence, so overlapping encounters share their samples.
+
+Config (under ``run``):
+    densify_near_flyby: true
+    densify:
+      quiet_every_steps: 10000        # default: output_every_steps
+      levels:                         # cadence within ±k crossing times
+        - {k: 3, every_steps: 1}
+        - {k: 30, every_steps: 10}
+"""
+from __future__ import annotations
+import heapq
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+import numpy as np
+
+from ..physics.constants import AU_PER_PC
+
+
+@dataclass(frozen=True)
+class Window:
+    start: int   # first step index (inclusive)
+    stop: int    # last step index (inclusive)
+    every: int   # output cadence in steps
+
+
+class OutputSchedule:
+    """Step indices ``0..steps`` at which outputs are due."""
+
+    def __init__(self, steps: int, every: int, windows: Iterable[Window] = ()):
+        self.steps = int(steps)
+        self.every = max(1, int(every))
+        self.windows = sorted(
+            (w for w in windows if w.stop >= 0 and w.start <= self.steps),
+            key=lambda w: w.start,
+        )
+
+    @classmethod
+    def from_flybys(cls, flybys, t0: float, dt: float, steps: int, every: int,
+                    levels: Iterable[dict] = ()) -> "OutputSchedule":
+        """Quiet cadence ``every`` plus one window per (flyby, level)."""
+        windows = []
+        for fb in flybys:
+            t_cross = max(float(fb.b_pc) * AU_PER_PC / float(fb.v_inf), dt)
+            for lvl in levels:
+                half = float(lvl["k"]) * t_cross
+                windows.append(Window(
+                    start=max(0, int(np.floor((fb.t - half - t0) / dt))),
+                    stop=min(steps, int(np.ceil((fb.t + half - t0) / dt))),
+                    every=max(1, int(lvl["every_steps"])),
+                ))
+        return cls(steps, every, windows)
+
+    @classmethod
+    def from_config(cls, run: dict, flybys, t0: float, dt: float, steps: int) -> "OutputSchedule":
+        every = int(run.get("output_every_steps", 100))
+        if not run.get("densify_near_flyby", False):
+            return cls(steps, every)
+        dens = run.get("densify") or {}
+        levels = dens.get("levels") or [
+            {"k": 3, "every_steps": 1},
+            {"k": 30, "every_steps": max(1, every // 10)},
+        ]
+        quiet = int(dens.get("quiet_every_steps", every))
+        return cls.from_flybys(flybys, t0, dt, steps, quiet, levels)
+
+    def __iter__(self) -> Iterator[int]:
+        """Yield scheduled steps in increasing order."""
+        windows, pending, active = self.windows, 0, []
+        i = 0
+        while i <= self.steps:
+            yield i
+            while pending < len(windows) and windows[pending].start <= i:
+                active.append(windows[pending])
+                pending += 1
+            active = [w for w in active if w.stop > i]
+            nxt = (i // self.every + 1) * self.every
+            for w in active:
+                cand = (i // w.every + 1) * w.every
+                if cand <= w.stop:
+                    nxt = min(nxt, cand)
+            j = pending
+            while j < len(windows) and windows[j].start < nxt:
+                w = windows[j]
+                cand = -(-w.start // w.every) * w.every  # first aligned step in window
+                if cand <= w.stop:
+                    nxt = min(nxt, cand)
+                j += 1
+            i = nxt
+
+    def estimate_count(self) -> int:
+        """Upper bound on the number of outputs (overlaps counted twice)."""
+        n = self.steps // self.every + 1
+        for w in self.windows:
+            n += (min(w.stop, self.steps) - max(w.start, 0)) // w.every + 1
+        return n
+
+
+def merge_schedules(*schedules: Iterable[int]) -> Iterator[tuple[int, tuple[bool, ...]]]:
+    """Merge increasing step streams; yield ``(step, due_flags)`` per distinct step."""
+    def tag(steps, k):
+        return ((i, k) for i in steps)
+
+    tagged = [tag(s, k) for k, s in enumerate(schedules)]
+    cur, flags = None, [False] * len(schedules)
+    for i, k in heapq.merge(*tagged):
+        if i != cur:
+            if cur is not None:
+                yield cur, tuple(flags)
+            cur, flags = i, [False] * len(schedules)
+        flags[k] = True
+    if cur is not None:
+        yield cur, tuple(flags)
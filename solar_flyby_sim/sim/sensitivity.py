@@ -0,0 +1,194 @@
+"""Variational-equation sensitivity of planetary elements to flyby parameters.
+
+Sensitivity mode attaches one first-order REBOUND variational particle set
+per selected parameter and integrates it with the main run, so a single
+integration yields d(elements)/d(parameter) instead of a finite-difference
+fan-out of perturbed runs. Supported parameters:
+
+- flyby stars present at the start (``intruder`` or flybys injected at t0):
+  ``m`` [Msun], ``v_inf`` [AU/yr], ``b_pc`` [pc], at fixed periapsis time
+  and geometry. The initial variation is the derivative of the star's
+  hyperbolic state (``flyby_injection.hyperbolic_state``).
+- body initial conditions via ``Variation.vary``: ``a``, ``e``, ``inc``,
+  ``Omega``, ``omega``, ``f``, ``m``.
+
+Optionally MEGNO and the Lyapunov exponent are tracked as chaos indicators.
+
+Notes: variational particles must come after all real particles, so stars
+cannot be injected once sensitivity is attached and are kept past exit.
+The variational equations are purely Newtonian: REBOUNDx does not evolve
+variational particles, so GR, J2 and every other force plugin act on the
+real particles only and are left out of the tangent dynamics. Config
+validation warns once when such forces are on; the matching REBOUNDx warning,
+otherwise raised on every ``integrate``, is silenced.
+
+Config:
+    sensitivity:
+      enabled: true
+      megno: true
+      params:
+        - {flyby: 0, param: v_inf}
+        - {flyby: 0, param: b_pc}
+        - {body: 3, param: a}
+"""
+from __future__ import annotations
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from ..analysis.elements import _rv_to_kepler
+from ..physics.constants import AU_PER_PC
+from .flyby_injection import FlybyManager, hyperbolic_state
+
+log = logging.getLogger("solar_flyby_sim.sensitivity")
+
+ELEMENTS = ("a", "e", "i", "Omega", "omega", "M", "varpi")
+_ANGLES = {"i", "Omega", "omega", "M", "varpi"}
+FLYBY_PARAMS = ("m", "v_inf", "b_pc")
+BODY_PARAMS = ("a", "e", "inc", "Omega", "omega", "f", "m")
+
+
+@dataclass
+class SensitivityParam:
+    label: str     # e.g. "flyby0.v_inf" or "body3.a"
+    kind: str      # "flyby" | "body"
+    index: int     # encounter id or particle index
+    param: str
+
+
+def element_derivatives(r, v, mu: float, dr, dv, dmu: float = 0.0) -> dict:
+    """Directional derivative of the elements along (dr, dv, dmu).
+
+    Central difference of ``_rv_to_kepler`` in the tangent direction; angle
+    differences are wrapped to (-π, π].
+    """
+    r, v, dr, dv = (np.asarray(x, dtype=float) for x in (r, v, dr, dv))
+    scale = max(np.linalg.norm(dr) / np.linalg.norm(r),
+                np.linalg.norm(dv) / np.linalg.norm(v),
+                abs(dmu) / mu)
+    if scale == 0.0:
+        return {f"d{k}": 0.0 for k in ELEMENTS}
+    h = 1e-7 / scale
+    plus = _rv_to_kepler(r + h * dr, v + h * dv, mu + h * dmu)
+    minus = _rv_to_kepler(r - h * dr, v - h * dv, mu - h * dmu)
+    out = {}
+    for k in ELEMENTS:
+        diff = plus[k] - minus[k]
+        if k in _ANGLES:
+            diff = (diff + math.pi) % (2.0 * math.pi) - math.pi
+        out[f"d{k}"] = diff / (2.0 * h)
+    return out
+
+
+class Sensitivity:
+    """Variational particles for selected parameters plus chaos indicators."""
+
+    def __init__(self, sim, params: list[SensitivityParam], flybys: FlybyManager | None = None,
+                 n_bodies: int | None = None, megno: bool = True, central_index: int = 0):
+        if flybys is not None and flybys.n_pending:
+            raise ValueError("Sensitivity mode needs every flyby star injected before it is "
+                             f"attached ({flybys.n_pending} still pending)")
+        self.sim = sim
+        self.params = params
+        self.central_index = central_index
+        self.n_bodies = n_bodies if n_bodies is not None else sim.N
+        self.megno = megno
+        if megno:
+            sim.init_megno()
+        self._vars = []
+        for p in params:
+            var = sim.add_variation(order=1)
+            if p.kind == "body":
+                var.vary(p.index, p.param, primary=sim.particles[central_index])
+            else:
+                self._init_flyby_variation(var, flybys, p)
+            self._vars.append(var)
+        contents = getattr(sim, "contents", None)
+        forces = contents.get("forces") if isinstance(contents, dict) else None
+        if forces is not None and forces.handles:
+            forces.quiet.append("REBOUNDx: Variational particles have been added")
+            log.debug("Tangent equations exclude %s", ", ".join(forces.handles))
+        self.rows: list[dict] = []
+        self.chaos: list[dict] = []
+        log.info("Sensitivity attached: %s%s", ", ".join(p.label for p in params),
+                 " + MEGNO" if megno else "")
+
+    @classmethod
+    def from_config(cls, sim, cfg: dict, flybys: FlybyManager | None, n_bodies: int) -> "Sensitivity":
+        params = []
+        for entry in cfg.get("params", []):
+            name = str(entry["param"])
+            if "flyby" in entry:
+                if name not in FLYBY_PARAMS:
+                    raise ValueError(f"Unknown flyby parameter {name!r}; expected one of {FLYBY_PARAMS}")
+                k = int(entry["flyby"])
+                params.append(SensitivityParam(f"flyby{k}.{name}", "flyby", k, name))
+            elif "body" in entry:
+                if name not in BODY_PARAMS:
+                    raise ValueError(f"Unknown body parameter {name!r}; expected one of {BODY_PARAMS}")
+                j = int(entry["body"])
+                if not 0 < j < n_bodies:
+                    raise IndexError(f"sensitivity body index {j} out of range")
+                params.append(SensitivityParam(f"body{j}.{name}", "body", j, name))
+            else:
+                raise ValueError(f"Sensitivity entry needs 'flyby' or 'body': {entry}")
+        return cls(sim, params, flybys, n_bodies, megno=bool(cfg.get("megno", True)))
+
+    def _init_flyby_variation(self, var, flybys: FlybyManager, p: SensitivityParam) -> None:
+        if flybys is None:
+            raise ValueError(f"{p.label}: no flyby manager")
+        fb, nhat, bhat = flybys.active_star(p.index)
+        sim = self.sim
+        star = sim.particles[flybys.encounters[p.index].hash].index
+        M0 = sim.particles[self.central_index].m
+        vals = {"m": fb.m, "v_inf": fb.v_inf, "b_pc": fb.b_pc}
+
+        def state(v):
+            r, vel = hyperbolic_state(sim.G * (M0 + v["m"]), v["v_inf"], v["b_pc"] * AU_PER_PC,
+                                      nhat, bhat, sim.t - fb.t)
+            return np.concatenate([r, vel])
+
+        h = 1e-6 * abs(vals[p.param])
+        up, dn = dict(vals), dict(vals)
+        up[p.param] += h
+        dn[p.param] -= h
+        d = (state(up) - state(dn)) / (2.0 * h)
+        vp = var.particles[star]
+        vp.x, vp.y, vp.z, vp.vx, vp.vy, vp.vz = (float(c) for c in d)
+        if p.param == "m":
+            vp.m = 1.0
+
+    def sample(self) -> None:
+        """Record d(elements)/d(param) of every body and the chaos indicators."""
+        sim = self.sim
+        parts = sim.particles
+        c = self.central_index
+        pc = parts[c]
+        for p, var in zip(self.params, self._vars):
+            vparts = var.particles
+            vc = vparts[c]
+            for j in range(self.n_bodies):
+                if j == c:
+                    continue
+                pj, vj = parts[j], vparts[j]
+                r = (pj.x - pc.x, pj.y - pc.y, pj.z - pc.z)
+                v = (pj.vx - pc.vx, pj.vy - pc.vy, pj.vz - pc.vz)
+                dr = (vj.x - vc.x, vj.y - vc.y, vj.z - vc.z)
+                dv = (vj.vx - vc.vx, vj.vy - vc.vy, vj.vz - vc.vz)
+                mu = sim.G * (pc.m + pj.m)
+                dmu = sim.G * (vc.m + vj.m)
+                row = {"t": sim.t, "param": p.label, "index": j}
+                row.update(element_derivatives(r, v, mu, dr, dv, dmu))
+                self.rows.append(row)
+        if self.megno:
+            self.chaos.append({"t": sim.t, "megno": sim.megno(), "lyapunov": sim.lyapunov()})
+
+    def finalize(self, outdir: Path) -> None:
+        outdir = Path(outdir)
+        if self.rows:
+            pd.DataFrame(self.rows).to_parquet(outdir / "sensitivity.parquet")
+        if self.chaos:
+            pd.DataFrame(self.chaos).to_csv(outdir / "chaos.csv", index=False)
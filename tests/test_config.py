@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from solar_flyby_sim.config import ConfigError, SimConfig, plan_run
+
+CONFIGS = sorted(Path("solar_flyby_sim/configs").glob("*.yaml"))
+
+
+@pytest.mark.parametrize("path", CONFIGS, ids=lambda p: p.stem)
+def test_shipped_configs_validate(path):
+    cfg = SimConfig.from_dict(yaml.safe_load(path.read_text()))
+    assert cfg.steps >= 1
+
+
+def test_unknown_keys_and_bad_types_are_reported_together():
+    raw = {
+        "run": {"duration_yr": 1.0, "dt_yr": "abc", "densify_near_flyb": True},
+        "phyiscs": {"gr": False},
+        "flybys": {"strong_threshold": "5e-9"},  # YAML reads this as a string; coerced
+    }
+    with pytest.raises(ConfigError) as exc:
+        SimConfig.from_dict(raw)
+    msg = str(exc.value)
+    assert "config.run.densify_near_flyb: unknown key (did you mean 'densify_near_flyby'?)" in msg
+    assert "config.phyiscs: unknown key (did you mean 'physics'?)" in msg
+    assert "config.run.dt_yr: expected a number" in msg
+    assert len(exc.value.errors) == 3
+
+
+def test_missing_csv_fails_before_run(tmp_path):
+    raw = {"run": {"duration_yr": 1.0, "dt_yr": 0.01}, "bodies": {"elements_csv": str(tmp_path / "none.csv")}}
+    with pytest.raises(ConfigError, match="elements_csv not found"):
+        SimConfig.from_dict(raw)
+
+
+def test_plan_resolves_counts(tmp_path):
+    cfg = SimConfig.from_dict({
+        "run": {"duration_yr": 10.0, "dt_yr": 0.01, "output_every_steps": 100, "smoke_stub": True},
+        "diagnostics": {"every_steps": 10},
+        "io": {"outdir": str(tmp_path / "out")},
+    })
+    plan = plan_run(cfg)
+    assert plan.steps == 1000
+    assert plan.n_bodies == 2
+    assert plan.n_outputs == 11
+    assert plan.n_diag == 101
+    assert plan.disk_bytes > 0 and plan.memory_bytes > 0
+
+
+def test_sensitivity_warns_once_about_forces_left_out(caplog):
+    raw = {
+        "run": {"duration_yr": 1.0, "dt_yr": 0.01, "smoke_stub": True},
+        "physics": {"gr": True, "solar_j2": False},
+        "sensitivity": {"enabled": True, "params": [{"body": 1, "param": "a"}]},
+    }
+    with caplog.at_level("WARNING", logger="solar_flyby_sim.config"):
+        SimConfig.from_dict(raw)
+    hits = [r for r in caplog.records if "left out" in r.getMessage()]
+    assert len(hits) == 1 and hits[0].getMessage().endswith(": gr")
+
+
+def test_plan_rejects_sensitivity_targets_missing_at_t0(tmp_path):
+    cfg = SimConfig.from_dict({
+        "run": {"duration_yr": 1.0, "dt_yr": 0.01, "smoke_stub": True},
+        "physics": {"gr": False, "solar_j2": False},
+        "sensitivity": {"enabled": True, "params": [{"flyby": 0, "param": "m"}, {"body": 5, "param": "a"}]},
+        "io": {"outdir": str(tmp_path / "out")},
+    })
+    with pytest.raises(ConfigError) as exc:
+        plan_run(cfg)
+    msg = str(exc.value)
+    assert "sensitivity.params[0]: flyby 0 does not exist" in msg
+    assert "sensitivity.params[1]: body 5 out of range 1..1" in msg
+
+
+def test_calibration_stops_follow_run_schedule(tmp_path):
+    from solar_flyby_sim.config import _stops
+
+    cfg = SimConfig.from_dict({
+        "run": {"duration_yr": 10.0, "dt_yr": 0.01, "output_every_steps": 100, "smoke_stub": True},
+        "diagnostics": {"every_steps": 50},
+        "io": {"outdir": str(tmp_path / "out")},
+    })
+    assert _stops(cfg, plan_run(cfg), 200) == [50, 100, 150, 200, 250]
@@ -0,0 +1,39 @@
+import numpy as np
+from solar_flyby_sim.plots.decimate import MinMaxReducer, _bin_index, minmax_decimate
+
+
+def test_minmax_decimate_keeps_envelope():
+    t = np.linspace(0.0, 100.0, 200_001)
+    y = np.sin(t) + 1e-3 * t
+    td, yd = minmax_decimate(t, y, n_bins=500)
+    assert td.size <= 1000
+    assert np.all(np.diff(td) > 0)
+    assert yd.max() == y.max() and yd.min() == y.min()
+
+
+def _per_bin(x, y, x0, span, n_bins):
+    b = _bin_index(x, x0, span, n_bins)
+    lo = np.full(n_bins, np.inf)
+    hi = np.full(n_bins, -np.inf)
+    np.minimum.at(lo, b, y)
+    np.maximum.at(hi, b, y)
+    return lo, hi
+
+
+def test_reducer_over_chunks_matches_per_bin_envelope():
+    rng = np.random.default_rng(1)
+    t = np.arange(2_000_000, dtype=float)
+    y = rng.normal(size=t.size)
+    red = MinMaxReducer((t[0], t[-1]), n_bins=500)
+    for k in range(0, t.size, 300_000):
+        red.update(t[k:k + 300_000], y[k:k + 300_000])
+    td, yd = red.result()
+    assert td.size <= 1000
+    assert np.all(np.diff(td) >= 0)
+
+    span = t[-1] - t[0]
+    want = _per_bin(t, y, t[0], span, 500)
+    got = _per_bin(td, yd, t[0], span, 500)
+    ref = _per_bin(*minmax_decimate(t, y, n_bins=500), t[0], span, 500)
+    for w, g, r in zip(want, got, ref):
+        assert np.array_equal(g, w) and np.array_equal(r, w)
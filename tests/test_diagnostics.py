@@ -0,0 +1,56 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    import rebound
+except ImportError:  # pragma: no cover
+    rebound = None
+
+from solar_flyby_sim.analysis.diagnostics import Diagnostics
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+def test_diagnostics_running_max_and_streamed_output(tmp_path, caplog):
+    sim = rebound.Simulation()
+    sim.G = 4.0 * math.pi**2
+    sim.integrator = "ias15"
+    sim.add(m=1.0)
+    sim.add(m=1e-3, a=1.0, e=0.3, primary=sim.particles[0])
+    sim.move_to_com()
+
+    diag = Diagnostics(sim, tmp_path, warn_dE=1e-30, buffer_rows=8)
+    for k in range(21):
+        sim.integrate(0.1 * k)
+        if k == 10:
+            diag.rebase()
+        diag.update()
+    diag.close()
+
+    energy = pd.read_csv(tmp_path / "energy.csv")
+    angmom = pd.read_csv(tmp_path / "angmom.csv")
+    assert len(energy) == len(angmom) == 21
+    assert energy["segment"].tolist() == angmom["segment"].tolist() == [0] * 10 + [1] * 11
+    assert energy["dE_rel"].max() == pytest.approx(diag.max_dE)
+    assert angmom["dL_rel"].max() == pytest.approx(diag.max_dL)
+    assert diag.max_dE < 1e-12
+    assert any("exceeded" in r.message for r in caplog.records)
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+def test_energy_includes_gr_and_j2_terms():
+    pytest.importorskip("reboundx")
+    from solar_flyby_sim.sim.driver import build_sim
+
+    cfg = {"run": {"dt_yr": 0.01}, "physics": {"gr": True, "solar_j2": True}, "bodies": {}}
+    sim = build_sim(cfg, np.random.default_rng(0))
+    diag = Diagnostics(sim)
+    E0_newton = sim.energy()
+    newton_drift = 0.0
+    for k in range(1, 101):
+        sim.integrate(0.5 * k)
+        diag.update()
+        newton_drift = max(newton_drift, abs(sim.energy() / E0_newton - 1.0))
+    assert diag.max_dE < 1e-13
+    assert newton_drift > 1e3 * diag.max_dE  # sim.energy() misses the 1PN and J2 terms
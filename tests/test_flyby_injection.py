@@ -0,0 +1,46 @@
+import math
+import numpy as np
+import pytest
+
+try:
+    import rebound
+except ImportError:  # pragma: no cover
+    rebound = None
+
+from solar_flyby_sim.physics.constants import AU_PER_PC
+from solar_flyby_sim.physics.stellar_passages import Flyby
+from solar_flyby_sim.sim.flyby_injection import FlybyManager
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+def test_overlapping_flybys_injected_tracked_and_removed(tmp_path):
+    sim = rebound.Simulation()
+    sim.G = 4.0 * math.pi**2
+    sim.integrator = "ias15"
+    sim.add(m=1.0)
+    sim.add(m=1e-3, a=5.0, primary=sim.particles[0])
+
+    b_AU, v_inf, m = 300.0, 4.0, 0.5
+    mu = sim.G * (1.0 + m)
+    e = math.sqrt(1.0 + (b_AU * v_inf**2 / mu) ** 2)
+    q_expected = b_AU * math.sqrt((e - 1.0) / (e + 1.0))
+
+    fbs = [
+        Flyby(t=600.0, m=m, v_inf=v_inf, b_pc=b_AU / AU_PER_PC, nhat=np.array([1.0, 0.0, 0.0]), impulse_grad=0.0),
+        Flyby(t=700.0, m=0.1, v_inf=6.0, b_pc=500.0 / AU_PER_PC, nhat=np.array([0.0, 1.0, 0.0]), impulse_grad=0.0),
+    ]
+    mgr = FlybyManager(sim, fbs, r_inject_AU=2000.0, rng=np.random.default_rng(3))
+    n_max = 0
+    for t in np.arange(0.0, 1600.0, 1.0):
+        sim.integrate(t)
+        mgr.update()
+        n_max = max(n_max, sim.N)
+    mgr.finalize(tmp_path)
+
+    assert n_max == 4 and sim.N == 2 and mgr.n_active == 0
+    enc = mgr.encounters[0]
+    assert enc.removed
+    # mutual perturbation by the second star is small at these distances
+    assert enc.q_min_AU == pytest.approx(q_expected, rel=1e-2)
+    assert enc.t_min == pytest.approx(600.0, abs=2.0)
+    assert (tmp_path / "encounters.csv").exists()
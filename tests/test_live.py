@@ -0,0 +1,59 @@
+import math
+import os
+import pandas as pd
+import pytest
+
+try:
+    import rebound
+except ImportError:  # pragma: no cover
+    rebound = None
+
+from solar_flyby_sim.analysis.elements import compute_elements
+from solar_flyby_sim.io.live import SnapshotRing
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+def test_ring_publish_and_attach_wraps_around():
+    sim = rebound.Simulation()
+    sim.G = 4.0 * math.pi**2
+    sim.add(m=1.0)
+    sim.add(m=3e-6, a=1.0, e=0.1, primary=sim.particles[0])
+    sim.add(m=1e-3, a=5.2, e=0.05, primary=sim.particles[0])
+    sim.move_to_com()
+
+    ring = SnapshotRing(f"sfs_test_{os.getpid()}", slots=4, max_particles=8)
+    reader = SnapshotRing.attach(ring.name)
+    try:
+        for k in range(6):
+            sim.integrate(0.5 * k)
+            ring.publish(sim, pd.DataFrame(compute_elements(sim)))
+        assert reader.head == 6
+        hist = reader.history()
+        assert [s["seqno"] for s in hist] == [2, 3, 4, 5]
+        snap = reader.latest()
+        assert snap["t"] == pytest.approx(2.5) and snap["N"] == 3
+        assert snap["xv"][2, 0] == pytest.approx(sim.particles[2].x)
+        assert snap["elems"][2, 0] == pytest.approx(compute_elements(sim)[1]["a"])
+        assert reader.read(0) is None
+    finally:
+        reader.close()
+        ring.close()
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+def test_ring_rejects_lapped_slot_and_name_clash():
+    sim = rebound.Simulation()
+    sim.add(m=1.0)
+    ring = SnapshotRing(f"sfs_test_lap_{os.getpid()}", slots=4, max_particles=2)
+    reader = SnapshotRing.attach(ring.name)
+    try:
+        with pytest.raises(FileExistsError, match="already exists"):
+            SnapshotRing(ring.name, slots=4, max_particles=2)
+        for _ in range(5):
+            ring.publish(sim)
+        ring._header[3] = 4  # snapshot 4 written into slot 0, head not yet advanced
+        assert reader.read(0) is None
+        assert reader.read(1)["seqno"] == 1
+    finally:
+        reader.close()
+        ring.close()
@@ -0,0 +1,65 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("pyarrow")
+
+from solar_flyby_sim.io.report import build_index, build_report
+
+
+def _write_run(run_dir, n=50):
+    run_dir.mkdir()
+    t = np.arange(n) * 0.1
+    pd.DataFrame({"t": t, "E": -1.0 + 1e-9 * t}).to_csv(run_dir / "energy.csv", index=False)
+    pd.DataFrame({"t": t, "Lx": 0.0, "Ly": 0.0, "Lz": 2.0}).to_csv(run_dir / "angmom.csv", index=False)
+    t_out = t[::5]  # element outputs on a coarser cadence than diagnostics
+    elems = pd.DataFrame({"t": np.repeat(t_out, 2), "a": np.tile([1.0, 5.2], len(t_out)),
+                          "e": 0.01, "i": 0.0, "index": np.tile([1, 2], len(t_out))})
+    elems.to_parquet(run_dir / "elements.parquet")
+
+
+def test_report_rebuilds_only_stale_artifacts(tmp_path):
+    run = tmp_path / "run0"
+    _write_run(run)
+    build_report(run)
+    rep = run / "report"
+    summary = json.loads((rep / "summary.json").read_text())
+    assert summary["n_bodies"] == 2 and summary["n_outputs"] == 10
+    assert summary["n_diag_samples"] == 50
+    assert summary["max_dE_rel"] == pytest.approx(4.9e-9)
+
+    mtimes = {p.name: p.stat().st_mtime_ns for p in rep.glob("*.png")}
+    st = (run / "energy.csv").stat()
+    os.utime(run / "energy.csv", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    build_report(run)
+    changed = {p.name for p in rep.glob("*.png") if p.stat().st_mtime_ns != mtimes[p.name]}
+    assert changed == {"energy_frac.png"}
+
+    index = build_index([run], tmp_path / "index.html")
+    assert "run0/report/index.html" in index.read_text()
+
+
+def test_summary_reanchors_drift_per_segment(tmp_path):
+    from solar_flyby_sim.io.report import run_summary
+    from solar_flyby_sim.plots.energy_conservation import _SegmentAnchor
+
+    run = tmp_path / "run1"
+    _write_run(run)
+    t = np.arange(50) * 0.1
+    seg = (t >= 2.0).astype(int)  # a star leaves at t=2: E and L jump
+    E = np.where(seg == 1, -0.5, -1.0) * (1.0 + 1e-12 * t)
+    pd.DataFrame({"t": t, "E": E, "dE_rel": 0.0, "segment": seg}).to_csv(run / "energy.csv", index=False)
+    Lz = np.where(seg == 1, 1.0, 2.0)
+    pd.DataFrame({"t": t, "Lx": 0.0, "Ly": 0.0, "Lz": Lz, "dL_rel": 0.0, "segment": seg}).to_csv(
+        run / "angmom.csv", index=False)
+    summary = run_summary(run)
+    assert summary["max_dE_rel"] < 1e-11 and summary["max_dL_rel"] == 0.0
+
+    # chunk boundaries inside and at segment changes give the same result
+    whole = _SegmentAnchor().rel(E, seg)
+    anchor = _SegmentAnchor()
+    parts = [anchor.rel(E[a:b], seg[a:b]) for a, b in ((0, 7), (7, 20), (20, 21), (21, 50))]
+    assert np.array_equal(np.concatenate(parts), whole)
@@ -0,0 +1,30 @@
+import numpy as np
+from solar_flyby_sim.physics.constants import AU_PER_PC
+from solar_flyby_sim.physics.stellar_passages import Flyby
+from solar_flyby_sim.sim.schedule import OutputSchedule, Window, merge_schedules
+
+
+def test_quiet_schedule_matches_fixed_cadence():
+    assert list(OutputSchedule(steps=25, every=10)) == [0, 10, 20]
+
+
+def test_dense_window_around_flyby():
+    dt = 0.01
+    fb = Flyby(t=500.0, m=0.5, v_inf=4.0, b_pc=4.0 / AU_PER_PC, nhat=np.zeros(3), impulse_grad=0.0)
+    # crossing time b / v_inf = 1 yr -> k=2 window spans 498..502 yr
+    sched = OutputSchedule.from_flybys([fb], 0.0, dt, steps=100_000, every=10_000,
+                                       levels=[{"k": 2, "every_steps": 50}])
+    steps = np.array(list(sched))
+    t = steps * dt
+    inside = (t >= 498.0) & (t <= 502.0)
+    assert np.all(np.diff(steps[inside]) == 50)
+    assert inside.sum() == 9  # 4 yr at 0.5 yr cadence
+    assert set(steps[~inside] % 10_000) == {0}
+    assert len(steps) < sched.estimate_count() + 1
+
+
+def test_overlapping_windows_and_merge():
+    sched = OutputSchedule(40, 20, [Window(5, 15, 2), Window(10, 30, 5)])
+    assert list(sched) == [0, 6, 8, 10, 12, 14, 15, 20, 25, 30, 40]
+    merged = dict(merge_schedules(OutputSchedule(10, 5), OutputSchedule(10, 2)))
+    assert merged[10] == (True, True) and merged[5] == (True, False) and merged[4] == (False, True)
@@ -0,0 +1,57 @@
+import math
+import numpy as np
+import pytest
+
+try:
+    import rebound
+except ImportError:  # pragma: no cover
+    rebound = None
+
+from solar_flyby_sim.analysis.elements import compute_elements
+from solar_flyby_sim.physics.constants import AU_PER_PC
+from solar_flyby_sim.physics.stellar_passages import Flyby
+from solar_flyby_sim.sim.flyby_injection import FlybyManager
+from solar_flyby_sim.sim.sensitivity import Sensitivity, SensitivityParam
+
+T_END = 300.0
+BASE = {"m": 0.5, "v_inf": 4.0, "b_pc": 40.0 / AU_PER_PC}
+
+
+def _run(vals, params=()):
+    sim = rebound.Simulation()
+    sim.G = 4.0 * math.pi**2
+    sim.integrator = "ias15"
+    sim.add(m=1.0)
+    sim.add(m=9.5e-4, a=5.2, e=0.05, primary=sim.particles[0])
+    sim.add(m=2.9e-4, a=9.5, e=0.05, inc=0.03, f=1.0, primary=sim.particles[0])
+    fb = Flyby(t=150.0, m=vals["m"], v_inf=vals["v_inf"], b_pc=vals["b_pc"],
+               nhat=np.array([0.6, 0.8, 0.0]), impulse_grad=0.0, bhat=np.array([0.0, 0.3, 1.0]))
+    mgr = FlybyManager(sim, r_inject_AU=800.0, remove_on_exit=False)
+    mgr.add(fb, r_inject_AU=800.0)
+    # star is due before t0 = 0, so it enters at t0 on its hyperbola
+    assert mgr.encounters[0].t_inject < 0.0
+    mgr.update()
+    sens = Sensitivity(sim, list(params), mgr, n_bodies=3, megno=True) if params else None
+    sim.integrate(T_END)
+    return sim, sens
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+@pytest.mark.parametrize("name", ["v_inf", "b_pc", "m"])
+def test_variational_matches_finite_differences(name):
+    sim, sens = _run(BASE, [SensitivityParam(f"flyby0.{name}", "flyby", 0, name)])
+    sens.sample()
+    var = {(r["index"]): r for r in sens.rows}
+
+    h = 1e-4 * BASE[name]
+    up, dn = dict(BASE), dict(BASE)
+    up[name] += h
+    dn[name] -= h
+    eu = compute_elements(_run(up)[0], n_bodies=3)
+    ed = compute_elements(_run(dn)[0], n_bodies=3)
+    for k in (0, 1):
+        j = k + 1
+        for el in ("a", "e"):
+            fd = (eu[k][el] - ed[k][el]) / (2.0 * h)
+            assert var[j][f"d{el}"] == pytest.approx(fd, rel=1e-5)
+    assert np.isfinite(sens.chaos[-1]["megno"])
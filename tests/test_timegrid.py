@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+try:
+    import rebound
+except ImportError:  # pragma: no cover
+    rebound = None
+
+from solar_flyby_sim.sim.timegrid import TimeGrid
+
+
+def test_grid_times_exact_at_1e9_steps():
+    dt, duration = 0.004109589, 2.0e7  # ~4.9e9 steps
+    grid = TimeGrid.build("grid", dt, duration)
+    s = grid.stats(grid.n_steps(duration), n_samples=50_000, n_exact=300)
+    assert s["steps"] > 1e9
+    assert s["max_spacing_dev"] == 0.0 and s["distinct_spacings"] == 1
+    assert s["max_rounding"] == 0.0
+    assert abs(s["dt_rel_change"]) < 1e-6
+
+    legacy = TimeGrid.build("legacy", dt, duration)
+    assert legacy.stats(legacy.n_steps(duration), n_samples=50_000, n_exact=300)["max_spacing_dev"] > 0.0
+
+
+@pytest.mark.skipif(rebound is None, reason="REBOUND not installed")
+@pytest.mark.parametrize("mode", ["grid", "free"])
+def test_integrate_on_grid(mode):
+    sim = rebound.Simulation()
+    sim.G = 4.0 * np.pi**2
+    sim.integrator = "ias15"
+    sim.add(m=1.0)
+    sim.add(m=1e-3, a=1.0, e=0.2, primary=sim.particles[0])
+    grid = TimeGrid.build(mode, 0.01369863, 10.0, t0=0.3)
+    sim.t = grid.t0
+    ts = []
+    for i in range(1, 301):
+        grid.advance(sim, i)
+        ts.append(sim.t)
+    ts = np.array(ts)
+    if mode == "grid":
+        assert np.array_equal(ts, grid.times(np.arange(1, 301)))
+        assert np.all(np.diff(ts) == grid.dt)
+    else:
+        assert np.all(ts >= grid.times(np.arange(1, 301)))